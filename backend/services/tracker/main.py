@@ -6,17 +6,19 @@ from sqlalchemy import select, and_
 from typing import List, Dict, Any, Optional
 import asyncio
 import hashlib
+import json
 from datetime import datetime
+from redis.exceptions import RedisError
 
 from backend.common.config import get_settings
-from backend.common.db import get_db_session
+from backend.common.db import get_db_session, get_redis
 from backend.common.models import (
     Site as SiteModel, Cluster as ClusterModel, Prompt as PromptModel,
     PromptVariant as PromptVariantModel, Run as RunModel, Answer as AnswerModel,
     Citation as CitationModel, Engine as EngineModel
 )
 from .engines import engine_manager, Answer as EngineAnswer
-from .prompt_variants import generate_prompt_variants, PromptVariant
+from .prompt_variants import generate_prompt_variants, variant_to_dict, variant_from_dict, PromptVariant
 
 app = FastAPI(title="OmniFunnel • Tracker Service", version="1.0.0")
 
@@ -91,6 +93,37 @@ class CitationResponse(BaseModel):
     position: int
 
 
+# Generated variants are deterministic per seed, so every worker can share them
+PROMPT_VARIANT_CACHE_TTL = 24 * 60 * 60
+
+
+async def get_prompt_variants(seed: str, count: int = 75, locale: str = "en") -> List[PromptVariant]:
+    """Generate prompt variants through a Redis read-through cache"""
+    key = "pv:" + hashlib.blake2b(f"{seed}|{count}|{locale}".encode(), digest_size=16).hexdigest()
+    
+    try:
+        redis_client = await get_redis()
+        cached = await redis_client.get(key)
+        if cached:
+            return [variant_from_dict(v) for v in json.loads(cached)]
+    except RedisError as e:
+        print(f"Prompt variant cache read failed: {e}")
+        return generate_prompt_variants(seed, count, locale)
+    
+    variants = generate_prompt_variants(seed, count, locale)
+    
+    try:
+        await redis_client.set(
+            key,
+            json.dumps([variant_to_dict(v) for v in variants]),
+            ex=PROMPT_VARIANT_CACHE_TTL
+        )
+    except RedisError as e:
+        print(f"Prompt variant cache write failed: {e}")
+    
+    return variants
+
+
 @app.get("/health")
 async def health() -> Dict[str, Any]:
     return {"status": "ok", "service": "tracker", "engines": engine_manager.list_engines()}
@@ -184,7 +217,7 @@ async def create_cluster(
     await db.flush()
     
     # Generate prompt variants
-    variants = generate_prompt_variants(cluster.seed_prompt, count=75)
+    variants = await get_prompt_variants(cluster.seed_prompt, count=75)
     
     for variant in variants:
         db_variant = PromptVariantModel(
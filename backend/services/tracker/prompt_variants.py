@@ -3,13 +3,43 @@ Prompt variant generator for testing different query formulations
 Based on technical specification - generates 50-100 prompt variants per cluster
 """
 
-import re
+import hashlib
 import random
-from typing import List, Dict, Any, Optional
+import re
+import sys
+import numpy as np
+from functools import lru_cache
+from itertools import chain, islice
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 
+# Question starters for reformatting
+QUESTION_STARTERS = (
+    "What are the",
+    "Which are the",
+    "Who are the",
+    "How do I find",
+    "Where can I find",
+    "What makes",
+    "Why should I choose",
+    "How do I select",
+)
+
+# Conversational prefixes
+CONVERSATIONAL_PREFIXES = (
+    "I'm looking for",
+    "Can you help me find",
+    "I need to know about",
+    "Tell me about",
+    "I want to understand",
+    "Please explain",
+    "Help me with",
+)
+
+
 class VariationType(Enum):
     SYNONYM = "synonym"
     REORDER = "reorder"
@@ -19,13 +49,72 @@ class VariationType(Enum):
     FORMAL = "formal"
 
 
-@dataclass
+@dataclass(slots=True)
 class PromptVariant:
     """Individual prompt variant with metadata"""
     text: str
     variant_type: VariationType
     confidence: float  # How likely this variant is to be used
-    generation_params: Dict[str, Any]
+    generation_params: Mapping[str, Any]
+
+
+@lru_cache(maxsize=64)
+def _gp(kind: str, value: Any) -> Mapping[str, Any]:
+    """Shared read-only generation_params for a single (kind, value) pair"""
+    if isinstance(value, str):
+        value = sys.intern(value)
+    return MappingProxyType({sys.intern(kind): value})
+
+
+def _synonym_rows(
+    words: List[str],
+    positions: List[int],
+    options: List[List[str]],
+    replace: List[List[bool]],
+    picks: List[List[int]]
+) -> List[Tuple[str, int]]:
+    """Apply pre-drawn synonym replacements, returning (text, replacements) per changed row"""
+    rows = []
+    
+    for row, flags in enumerate(replace):
+        new_words = words.copy()
+        replacements_made = 0
+        
+        for col, i in enumerate(positions):
+            if flags[col]:
+                new_words[i] = options[col][picks[col][row]]
+                replacements_made += 1
+        
+        if replacements_made > 0:
+            rows.append((" ".join(new_words), replacements_made))
+    
+    return rows
+
+
+def _swap_rows(words: List[str], swaps: List[List[bool]]) -> List[str]:
+    """Apply pre-drawn adjacent word swaps, returning one joined text per row"""
+    rows = []
+    
+    for flags in swaps:
+        # Simple reordering strategies
+        reordered = words.copy()
+        
+        # Strategy 1: Move adjectives
+        # Find adjective-noun pairs and potentially swap
+        for i, swap in enumerate(flags):
+            if swap:
+                reordered[i], reordered[i + 1] = reordered[i + 1], reordered[i]
+        
+        rows.append(" ".join(reordered))
+    
+    return rows
+
+
+# Use the compiled kernels when the Cython extension has been built
+try:
+    from .prompt_variants_fast import synonym_rows as _synonym_rows, swap_rows as _swap_rows
+except ImportError:
+    pass
 
 
 class PromptVariantGenerator:
@@ -44,151 +133,129 @@ class PromptVariantGenerator:
             "software": ["platform", "tool", "application", "system"],
             "agency": ["company", "firm", "consultancy", "service provider"],
         }
-        
-        # Question starters for reformatting
-        self.question_starters = [
-            "What are the",
-            "Which are the",
-            "Who are the",
-            "How do I find",
-            "Where can I find",
-            "What makes",
-            "Why should I choose",
-            "How do I select",
-        ]
-        
-        # Conversational prefixes
-        self.conversational_prefixes = [
-            "I'm looking for",
-            "Can you help me find",
-            "I need to know about",
-            "Tell me about",
-            "I want to understand",
-            "Please explain",
-            "Help me with",
-        ]
     
     def generate_variants(
         self, 
         seed_prompt: str, 
         target_count: int = 75,
-        locale: str = "en"
+        locale: str = "en",
+        rng: Optional[random.Random] = None
     ) -> List[PromptVariant]:
-        """Generate multiple variants of a seed prompt"""
+        """Generate multiple variants of a seed prompt
+        
+        Output is deterministic per seed prompt unless an explicit rng is passed,
+        so results can be cached and shared across tracker workers.
+        """
+        
+        if rng is None:
+            rng = random.Random(hashlib.blake2b(seed_prompt.encode(), digest_size=8).digest())
+        np_rng = np.random.default_rng(rng.getrandbits(64))
         
-        variants = []
-        seed_lower = seed_prompt.lower()
+        # Tokenize once and share the word lists with the helpers that need them
+        words = seed_prompt.split()
+        words_lower = seed_prompt.lower().split()
         
         # Always include the original
-        variants.append(PromptVariant(
+        original = PromptVariant(
             text=seed_prompt,
             variant_type=VariationType.SYNONYM,
             confidence=1.0,
-            generation_params={"original": True}
-        ))
+            generation_params=_gp("original", True)
+        )
         
-        # Generate different types of variants
-        variants.extend(self._generate_synonym_variants(seed_prompt, target_count // 4))
-        variants.extend(self._generate_reorder_variants(seed_prompt, target_count // 6))
-        variants.extend(self._generate_question_variants(seed_prompt, target_count // 4))
-        variants.extend(self._generate_long_tail_variants(seed_prompt, target_count // 5))
-        variants.extend(self._generate_conversational_variants(seed_prompt, target_count // 6))
-        variants.extend(self._generate_formal_variants(seed_prompt, target_count // 8))
+        # Strategies are consumed lazily, so generation stops as soon as
+        # target_count unique variants have been produced. Creative variants
+        # come last and only fill whatever the other strategies left over.
+        # Reordering needs at least three words, so skip it entirely otherwise.
+        reorder = (
+            self._generate_reorder_variants(seed_prompt, words, target_count // 6, np_rng)
+            if len(words) >= 3 else ()
+        )
+        stream = chain(
+            (original,),
+            self._generate_synonym_variants(words_lower, target_count // 4, np_rng),
+            reorder,
+            self._generate_question_variants(seed_prompt, target_count // 4),
+            self._generate_long_tail_variants(seed_prompt, target_count // 5),
+            self._generate_conversational_variants(seed_prompt, target_count // 6),
+            self._generate_formal_variants(seed_prompt, target_count // 8),
+            self._generate_creative_variants(seed_prompt, target_count),
+        )
         
-        # Remove duplicates and limit to target count
-        unique_variants = self._deduplicate_variants(variants)
+        return list(islice(self._deduplicate_variants(stream), target_count))
+    
+    def _generate_synonym_variants(self, words: List[str], count: int, rng: np.random.Generator) -> Iterator[PromptVariant]:
+        """Replace words with synonyms in the lowercased seed tokens"""
+        synonyms = self.synonyms
+        positions = [i for i, word in enumerate(words) if word in synonyms]
         
-        # If we need more variants, generate additional ones
-        while len(unique_variants) < target_count:
-            additional = self._generate_creative_variants(seed_prompt, target_count - len(unique_variants))
-            unique_variants.extend(additional)
-            unique_variants = self._deduplicate_variants(unique_variants)
-            break  # Prevent infinite loop
+        if not positions or count <= 0:
+            return
         
-        return unique_variants[:target_count]
-    
-    def _generate_synonym_variants(self, seed: str, count: int) -> List[PromptVariant]:
-        """Replace words with synonyms"""
-        variants = []
-        words = seed.lower().split()
+        # Resolve each position's synonym list once instead of per replacement
+        options = [synonyms[words[i]] for i in positions]
         
-        for _ in range(count):
-            new_words = words.copy()
-            replacements_made = 0
-            
-            for i, word in enumerate(words):
-                if word in self.synonyms and random.random() < 0.4:  # 40% chance to replace
-                    new_words[i] = random.choice(self.synonyms[word])
-                    replacements_made += 1
-            
-            if replacements_made > 0:
-                new_text = " ".join(new_words)
-                variants.append(PromptVariant(
-                    text=new_text.capitalize(),
-                    variant_type=VariationType.SYNONYM,
-                    confidence=0.8,
-                    generation_params={"replacements": replacements_made}
-                ))
+        # Draw every replace decision and synonym pick up front in one batch
+        replace = (rng.random((count, len(positions))) < 0.4).tolist()  # 40% chance to replace
+        picks = [
+            rng.integers(0, len(choices), size=count).tolist()
+            for choices in options
+        ]
         
-        return variants
+        for new_text, replacements_made in _synonym_rows(words, positions, options, replace, picks):
+            yield PromptVariant(
+                text=new_text.capitalize(),
+                variant_type=VariationType.SYNONYM,
+                confidence=0.8,
+                generation_params=_gp("replacements", replacements_made)
+            )
     
-    def _generate_reorder_variants(self, seed: str, count: int) -> List[PromptVariant]:
-        """Reorder words while maintaining meaning"""
-        variants = []
-        words = seed.split()
+    def _generate_reorder_variants(
+        self, seed: str, words: List[str], count: int, rng: np.random.Generator
+    ) -> Iterator[PromptVariant]:
+        """Reorder the seed tokens while maintaining meaning"""
+        if count <= 0:
+            return
         
-        if len(words) < 3:
-            return variants
+        # One batched draw covers every adjacent-pair swap decision
+        swaps = (rng.random((count, len(words) - 1)) < 0.3).tolist()
         
-        for _ in range(count):
-            # Simple reordering strategies
-            reordered = words.copy()
-            
-            # Strategy 1: Move adjectives
-            if len(words) >= 3:
-                # Find adjective-noun pairs and potentially swap
-                for i in range(len(words) - 1):
-                    if random.random() < 0.3:
-                        reordered[i], reordered[i + 1] = reordered[i + 1], reordered[i]
-            
-            new_text = " ".join(reordered)
+        for new_text in _swap_rows(words, swaps):
             if new_text != seed:
-                variants.append(PromptVariant(
+                yield PromptVariant(
                     text=new_text,
                     variant_type=VariationType.REORDER,
                     confidence=0.7,
-                    generation_params={"strategy": "word_swap"}
-                ))
-        
-        return variants
+                    generation_params=_gp("strategy", "word_swap")
+                )
     
-    def _generate_question_variants(self, seed: str, count: int) -> List[PromptVariant]:
+    def _generate_question_variants(self, seed: str, count: int) -> Iterator[PromptVariant]:
         """Convert statements to questions"""
-        variants = []
+        seed_lower = seed.lower()
+        has_best = "best" in seed_lower
+        is_how_to = "how to" in seed_lower
+        subject = seed_lower.replace('best ', '') if has_best else seed_lower
         
-        for starter in self.question_starters[:count]:
+        for starter in islice(QUESTION_STARTERS, count):
             # Simple question formation
-            if "best" in seed.lower():
-                question = f"{starter} {seed.lower().replace('best ', '')}"
-            elif "how to" in seed.lower():
+            if has_best:
+                question = f"{starter} {subject}"
+            elif is_how_to:
                 question = seed  # Already a question
             else:
-                question = f"{starter} {seed.lower()}"
+                question = f"{starter} {subject}"
             
             question = question.capitalize().rstrip('.') + "?"
             
-            variants.append(PromptVariant(
+            yield PromptVariant(
                 text=question,
                 variant_type=VariationType.QUESTION_FORMAT,
                 confidence=0.85,
-                generation_params={"starter": starter}
-            ))
-        
-        return variants
+                generation_params=_gp("starter", starter)
+            )
     
-    def _generate_long_tail_variants(self, seed: str, count: int) -> List[PromptVariant]:
+    def _generate_long_tail_variants(self, seed: str, count: int) -> Iterator[PromptVariant]:
         """Generate longer, more specific variants"""
-        variants = []
         
         # Common modifiers for long-tail
         modifiers = [
@@ -204,91 +271,82 @@ class PromptVariantGenerator:
             "for enterprise"
         ]
         
+        seed_space = seed + " "
+        
         for i in range(count):
             modifier = modifiers[i % len(modifiers)]
-            long_tail = f"{seed} {modifier}"
+            long_tail = seed_space + modifier
             
-            variants.append(PromptVariant(
+            yield PromptVariant(
                 text=long_tail,
                 variant_type=VariationType.LONG_TAIL,
                 confidence=0.75,
-                generation_params={"modifier": modifier}
-            ))
-        
-        return variants
+                generation_params=_gp("modifier", modifier)
+            )
     
-    def _generate_conversational_variants(self, seed: str, count: int) -> List[PromptVariant]:
+    def _generate_conversational_variants(self, seed: str, count: int) -> Iterator[PromptVariant]:
         """Generate conversational style prompts"""
-        variants = []
+        seed_lower = seed.lower()
         
-        for prefix in self.conversational_prefixes[:count]:
-            conversational = f"{prefix} {seed.lower()}"
+        for prefix in islice(CONVERSATIONAL_PREFIXES, count):
+            conversational = f"{prefix} {seed_lower}"
             
-            variants.append(PromptVariant(
+            yield PromptVariant(
                 text=conversational.capitalize(),
                 variant_type=VariationType.CONVERSATIONAL,
                 confidence=0.8,
-                generation_params={"prefix": prefix}
-            ))
-        
-        return variants
+                generation_params=_gp("prefix", prefix)
+            )
     
-    def _generate_formal_variants(self, seed: str, count: int) -> List[PromptVariant]:
+    def _generate_formal_variants(self, seed: str, count: int) -> Iterator[PromptVariant]:
         """Generate formal/academic style variants"""
-        variants = []
         
+        seed_lower = seed.lower()
         formal_patterns = [
-            f"An analysis of {seed.lower()}",
-            f"Comprehensive guide to {seed.lower()}",
-            f"Professional assessment of {seed.lower()}",
-            f"Enterprise solutions for {seed.lower()}",
-            f"Industry standards for {seed.lower()}",
+            f"An analysis of {seed_lower}",
+            f"Comprehensive guide to {seed_lower}",
+            f"Professional assessment of {seed_lower}",
+            f"Enterprise solutions for {seed_lower}",
+            f"Industry standards for {seed_lower}",
         ]
         
         for pattern in formal_patterns[:count]:
-            variants.append(PromptVariant(
+            yield PromptVariant(
                 text=pattern,
                 variant_type=VariationType.FORMAL,
                 confidence=0.7,
-                generation_params={"pattern": "formal"}
-            ))
-        
-        return variants
+                generation_params=_gp("pattern", "formal")
+            )
     
-    def _generate_creative_variants(self, seed: str, count: int) -> List[PromptVariant]:
+    def _generate_creative_variants(self, seed: str, count: int) -> Iterator[PromptVariant]:
         """Generate additional creative variants when needed"""
-        variants = []
         
+        seed_lower = seed.lower()
         creative_modifications = [
             f"{seed} recommendations",
             f"{seed} options",
             f"{seed} alternatives",
-            f"Top {seed.lower()} solutions",
-            f"Ultimate {seed.lower()} guide",
+            f"Top {seed_lower} solutions",
+            f"Ultimate {seed_lower} guide",
         ]
         
         for mod in creative_modifications[:count]:
-            variants.append(PromptVariant(
+            yield PromptVariant(
                 text=mod,
                 variant_type=VariationType.SYNONYM,
                 confidence=0.6,
-                generation_params={"creative": True}
-            ))
-        
-        return variants
+                generation_params=_gp("creative", True)
+            )
     
-    def _deduplicate_variants(self, variants: List[PromptVariant]) -> List[PromptVariant]:
+    def _deduplicate_variants(self, variants: Iterable[PromptVariant]) -> Iterator[PromptVariant]:
         """Remove duplicate variants based on text"""
         seen = set()
-        unique = []
         
         for variant in variants:
             text_lower = variant.text.lower().strip()
             if text_lower not in seen:
                 seen.add(text_lower)
-                unique.append(variant)
-        
-        return unique
+                yield variant
     
     def analyze_variant_distribution(self, variants: List[PromptVariant]) -> Dict[str, int]:
         """Analyze the distribution of variant types"""
@@ -300,10 +358,35 @@ class PromptVariantGenerator:
 
 
 # Utility functions
-def generate_prompt_variants(seed: str, count: int = 75, locale: str = "en") -> List[PromptVariant]:
+def generate_prompt_variants(
+    seed: str,
+    count: int = 75,
+    locale: str = "en",
+    rng: Optional[random.Random] = None
+) -> List[PromptVariant]:
     """Convenience function to generate prompt variants"""
     generator = PromptVariantGenerator()
-    return generator.generate_variants(seed, count, locale)
+    return generator.generate_variants(seed, count, locale, rng)
+
+
+def variant_to_dict(variant: PromptVariant) -> Dict[str, Any]:
+    """Serialize a variant to a JSON-compatible dict"""
+    return {
+        "text": variant.text,
+        "variant_type": variant.variant_type.value,
+        "confidence": variant.confidence,
+        "generation_params": dict(variant.generation_params),
+    }
+
+
+def variant_from_dict(data: Dict[str, Any]) -> PromptVariant:
+    """Rebuild a variant serialized by variant_to_dict"""
+    return PromptVariant(
+        text=data["text"],
+        variant_type=VariationType(data["variant_type"]),
+        confidence=data["confidence"],
+        generation_params=data["generation_params"],
+    )
 
 
 def variants_to_strings(variants: List[PromptVariant]) -> List[str]:
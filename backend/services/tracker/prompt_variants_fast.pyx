@@ -0,0 +1,49 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled inner loops for prompt variant generation
+Drop-in replacements for _synonym_rows/_swap_rows in prompt_variants.py
+"""
+
+
+cpdef list synonym_rows(list words, list positions, list options, list replace, list picks):
+    """Apply pre-drawn synonym replacements, returning (text, replacements) per changed row"""
+    cdef list rows = []
+    cdef list new_words
+    cdef list flags
+    cdef Py_ssize_t row, col
+    cdef Py_ssize_t n_cols = len(positions)
+    cdef int replacements_made
+    
+    for row in range(len(replace)):
+        flags = <list>replace[row]
+        new_words = list(words)
+        replacements_made = 0
+        
+        for col in range(n_cols):
+            if flags[col]:
+                new_words[<Py_ssize_t>positions[col]] = (<list>options[col])[<Py_ssize_t>(<list>picks[col])[row]]
+                replacements_made += 1
+        
+        if replacements_made > 0:
+            rows.append((" ".join(new_words), replacements_made))
+    
+    return rows
+
+
+cpdef list swap_rows(list words, list swaps):
+    """Apply pre-drawn adjacent word swaps, returning one joined text per row"""
+    cdef list rows = []
+    cdef list reordered
+    cdef list flags
+    cdef Py_ssize_t i
+    
+    for flags in swaps:
+        reordered = list(words)
+        
+        for i in range(len(flags)):
+            if flags[i]:
+                reordered[i], reordered[i + 1] = reordered[i + 1], reordered[i]
+        
+        rows.append(" ".join(reordered))
+    
+    return rows
@@ -13,7 +13,26 @@ from backend.services.tracker.engines import engine_manager, EngineManager
 from backend.services.tracker.prompt_variants import generate_prompt_variants
 from backend.services.score.main import AIVisibilityScoreCalculator
 import asyncio
+import bisect
 import json
+import numpy as np
+
+# AI Visibility Score™ components and their weights, in matching order
+SCORE_COMPONENTS = (
+    'prompt_sov', 'generative_appearance', 'citation_authority', 'answer_quality',
+    'voice_presence', 'ai_traffic', 'ai_conversions'
+)
+SCORE_WEIGHTS = np.array([0.30, 0.20, 0.15, 0.10, 0.05, 0.10, 0.10])
+GRADE_CUTOFFS = (60, 70, 80, 90)
+GRADES = ('D', 'C', 'B', 'A', 'A+')
+
+# Caps in-flight engine queries so concurrent demos stay under provider rate limits
+LLM_SEMAPHORE = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "4")))
+
+async def bounded_query(engine_name, prompt):
+    """Query an engine while holding a concurrency slot"""
+    async with LLM_SEMAPHORE:
+        return await engine_manager.query_engine(engine_name, prompt)
 
 async def demo_prompt_variants():
     """Demo: Generate prompt variants"""
@@ -45,24 +64,30 @@ async def demo_ai_engines():
     print(f"Testing prompt: '{test_prompt}'")
     print()
     
-    # Test each engine
-    for engine_name in engine_manager.list_engines():
-        try:
-            print(f"Testing {engine_name.upper()}...")
-            answer = await engine_manager.query_engine(engine_name, test_prompt)
-            
-            print(f"✅ {engine_name}: Response length: {len(answer.raw_text)} chars")
-            print(f"   Citations found: {len(answer.citations)}")
-            print(f"   Confidence: {answer.confidence}")
-            print(f"   Sample: {answer.raw_text[:100]}...")
-            
-            if answer.citations:
-                print(f"   Top citation: {answer.citations[0]}")
-            print()
-            
-        except Exception as e:
-            print(f"❌ {engine_name}: {str(e)}")
+    # Query engines concurrently (bounded by LLM_CONCURRENCY); total wait is the
+    # slowest batch, not the sum of every engine
+    engines = engine_manager.list_engines()
+    print(f"Testing {', '.join(name.upper() for name in engines)}...")
+    print()
+    results = await asyncio.gather(
+        *[bounded_query(engine_name, test_prompt) for engine_name in engines],
+        return_exceptions=True
+    )
+    
+    for engine_name, answer in zip(engines, results):
+        if isinstance(answer, Exception):
+            print(f"❌ {engine_name}: {str(answer)}")
             print()
+            continue
+        
+        print(f"✅ {engine_name}: Response length: {len(answer.raw_text)} chars")
+        print(f"   Citations found: {len(answer.citations)}")
+        print(f"   Confidence: {answer.confidence}")
+        print(f"   Sample: {answer.raw_text[:100]}...")
+        
+        if answer.citations:
+            print(f"   Top citation: {answer.citations[0]}")
+        print()
     
     print("=" * 50)
 
@@ -82,41 +107,21 @@ def demo_score_calculation():
         'ai_conversions': 38.0        # 10% weight
     }
     
-    weights = {
-        'prompt_sov': 0.30,
-        'generative_appearance': 0.20,
-        'citation_authority': 0.15,
-        'answer_quality': 0.10,
-        'voice_presence': 0.05,
-        'ai_traffic': 0.10,
-        'ai_conversions': 0.10
-    }
+    scores = np.fromiter((mock_subscores[c] for c in SCORE_COMPONENTS), dtype=float, count=len(SCORE_COMPONENTS))
+    weighted_scores = scores * SCORE_WEIGHTS
+    total_score = float(scores @ SCORE_WEIGHTS)
     
     print("Score Components:")
     print("-" * 30)
-    total_score = 0
     
-    for component, score in mock_subscores.items():
-        weight = weights[component]
-        weighted_score = score * weight
-        total_score += weighted_score
-        
+    for component, score, weight, weighted_score in zip(SCORE_COMPONENTS, scores, SCORE_WEIGHTS, weighted_scores):
         print(f"{component.replace('_', ' ').title():25s}: {score:5.1f} × {weight:.0%} = {weighted_score:5.2f}")
     
     print("-" * 30)
     print(f"{'TOTAL AI VISIBILITY SCORE':25s}: {total_score:5.1f}/100")
     
-    # Grade calculation
-    if total_score >= 90:
-        grade = "A+"
-    elif total_score >= 80:
-        grade = "A"
-    elif total_score >= 70:
-        grade = "B"
-    elif total_score >= 60:
-        grade = "C"
-    else:
-        grade = "D"
+    # Grade calculation - a score exactly on a cutoff earns the higher grade
+    grade = GRADES[bisect.bisect_right(GRADE_CUTOFFS, total_score)]
     
     print(f"{'GRADE':25s}: {grade}")
     
@@ -183,19 +188,20 @@ async def main():
     print("=" * 60)
     print()
     
+    # Launch the async demos first so they run while the sync demos print;
+    # the tasks start at the first await below
+    variants_task = asyncio.create_task(demo_prompt_variants())
+    engines_task = asyncio.create_task(demo_ai_engines())  # using mock responses
+    
     # Show project structure
     demo_project_structure()
     
-    # Demo prompt variants
-    await demo_prompt_variants()
-    print()
-    
     # Demo score calculation
     demo_score_calculation()
     print()
     
-    # Demo AI engines (using mock responses)
-    await demo_ai_engines()
+    # Demo prompt variants and AI engines
+    await asyncio.gather(variants_task, engines_task)
     
     print("\n🌐 FRONTEND DEMO:")
     print("Visit http://localhost:3000 to see the complete dashboard!")
@@ -5,17 +5,24 @@ Tracks Google AI Overviews, Bing Copilot, and generative search features
 Based on specification section 6.3
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Any, Iterator, List, Optional
+from collections import defaultdict, deque
+from datetime import datetime
+from functools import lru_cache
+import asyncio
+import hashlib
 import httpx
 import json
-from datetime import datetime
+import numpy as np
+import orjson
 import uvicorn
 import re
 
-app = FastAPI(title="OmniFunnel • GEO Tracker")
+app = FastAPI(title="OmniFunnel • GEO Tracker", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,21 +32,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Storage
-generative_triggers = []
-content_gaps = []
-sge_monitoring = []
+# Cache-Control policy for idempotent GETs; these also get a body-hash ETag
+CACHE_CONTROL = {
+    "/health": "max-age=5",
+    "/v1/geo/trigger-history": "public, max-age=30",
+    "/v1/geo/gaps": "public, max-age=30"
+}
+
+@app.middleware("http")
+async def http_cache_headers(request: Request, call_next):
+    """Add ETag/Cache-Control to cacheable GETs and answer If-None-Match with 304"""
+    cache_control = CACHE_CONTROL.get(request.url.path)
+    if request.method != "GET" or cache_control is None:
+        return await call_next(request)
+    
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    headers = {**response.headers, **headers}
+    headers.pop("content-length", None)
+    return Response(content=body, status_code=200, headers=headers, media_type=response.media_type)
+
+# Trigger phrases, compiled once and matched as substrings like the original keyword lists
+AI_OVERVIEW_TRIGGERS = re.compile(r"how to|what is|best|vs|comparison|guide", re.I)
+BING_COPILOT_TRIGGERS = re.compile(r"help me|can you|i need|explain|tell me", re.I)
+SGE_TRIGGERS = re.compile(r"what|how|why|when|where|best|top|guide", re.I)
+
+# Storage - indexed by site_id and capped per site so history stays bounded
+HISTORY_LIMIT = 1000
+generative_triggers = defaultdict(lambda: deque(maxlen=HISTORY_LIMIT))
+content_gaps = defaultdict(lambda: deque(maxlen=HISTORY_LIMIT))
+sge_monitoring = defaultdict(lambda: deque(maxlen=HISTORY_LIMIT))
 
 class GenerativeTriggerCheck(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     query: str
     site_id: int
     engines: List[str] = ["google_ai_overview", "bing_copilot", "google_sge"]
 
 class ContentGapRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     site_id: int
     cluster_id: int
     missing_engines: List[str]
 
+# Content recommendations for engines a cluster is missing from
+CONTENT_RECOMMENDATIONS = {
+    "gemini": {
+        "content_type": "structured_data",
+        "recommendation": "Create detailed comparison tables - Gemini favors structured data",
+        "priority": "high",
+        "estimated_impact": "25-40% improvement in Gemini presence"
+    },
+    "perplexity": {
+        "content_type": "research_citations",
+        "recommendation": "Add more academic and research citations - Perplexity values authoritative sources",
+        "priority": "medium",
+        "estimated_impact": "15-30% improvement in Perplexity citations"
+    },
+    "bing_copilot": {
+        "content_type": "conversational_qa",
+        "recommendation": "Create conversational Q&A format - Bing Copilot prefers dialogue structure",
+        "priority": "medium",
+        "estimated_impact": "20-35% improvement in Bing Copilot presence"
+    }
+}
+
+# Shared client for tracker lookups, pooled across requests
+tracker_client: Optional[httpx.AsyncClient] = None
+
+@app.on_event("startup")
+async def startup():
+    """Open the pooled tracker client"""
+    global tracker_client
+    tracker_client = httpx.AsyncClient(
+        base_url="http://localhost:8001",
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=32)
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the pooled tracker client"""
+    await tracker_client.aclose()
+
 @app.get("/health")
 async def health():
     return {
@@ -48,19 +134,20 @@ async def health():
         "features": ["ai_overviews", "sge_monitoring", "content_gaps", "trigger_detection"]
     }
 
-@app.post("/v1/geo/check-triggers")
-async def check_generative_triggers(request: GenerativeTriggerCheck):
-    """Check if queries trigger AI Overviews/SGE/Copilot"""
+async def run_trigger_check(request: GenerativeTriggerCheck) -> Dict[str, Any]:
+    """Check one query against its engines and record the result"""
     
+    # One timestamp for the whole check, shared by every engine result
+    now_iso = datetime.now().isoformat()
     results = {}
     
     for engine in request.engines:
         if engine == "google_ai_overview":
-            trigger_result = await check_google_ai_overview(request.query)
+            trigger_result = await check_google_ai_overview(request.query, now_iso=now_iso)
         elif engine == "bing_copilot":
-            trigger_result = await check_bing_copilot(request.query)
+            trigger_result = await check_bing_copilot(request.query, now_iso=now_iso)
         elif engine == "google_sge":
-            trigger_result = await check_google_sge(request.query)
+            trigger_result = await check_google_sge(request.query, now_iso=now_iso)
         else:
             trigger_result = {"triggered": False, "reason": "Engine not supported"}
         
@@ -71,161 +158,206 @@ async def check_generative_triggers(request: GenerativeTriggerCheck):
         "query": request.query,
         "site_id": request.site_id,
         "results": results,
-        "checked_at": datetime.now().isoformat(),
-        "total_triggers": sum(1 for r in results.values() if r.get("triggered", False))
+        "checked_at": now_iso,
+        "total_triggers": sum(r.get("triggered", False) for r in results.values())
     }
     
-    generative_triggers.append(trigger_data)
+    generative_triggers[request.site_id].append(trigger_data)
     return trigger_data
 
+@app.post("/v1/geo/check-triggers")
+async def check_generative_triggers(request: GenerativeTriggerCheck):
+    """Check if queries trigger AI Overviews/SGE/Copilot"""
+    return await run_trigger_check(request)
+
+@app.post("/v1/geo/check-triggers-batch")
+async def check_generative_triggers_batch(requests: List[GenerativeTriggerCheck]):
+    """Check many queries in one call, sharing a single parse and response"""
+    return await asyncio.gather(*[run_trigger_check(request) for request in requests])
+
 @app.post("/v1/geo/content-gaps")
 async def analyze_content_gaps(request: ContentGapRequest):
     """Analyze content gaps for missing AI engine appearances"""
     
     # Get current cluster performance
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://localhost:8001/v1/clusters/{request.cluster_id}/answers")
+        response = await tracker_client.get(f"/v1/clusters/{request.cluster_id}/answers")
+        
+        if response.status_code == 200:
+            answers = response.json()
+            
+            # Analyze engine coverage
+            engines_with_answers = {answer["engine"] for answer in answers}
+            missing_engines = set(request.missing_engines) - engines_with_answers
+            
+            # Generate content recommendations for missing engines
+            recommendations = [
+                {"engine": engine, **CONTENT_RECOMMENDATIONS[engine]}
+                for engine in missing_engines
+                if engine in CONTENT_RECOMMENDATIONS
+            ]
+            
+            gap_analysis = {
+                "site_id": request.site_id,
+                "cluster_id": request.cluster_id,
+                "analyzed_at": datetime.now().isoformat(),
+                "total_engines_tested": len(engines_with_answers),
+                "missing_engines": list(missing_engines),
+                "coverage_percentage": (len(engines_with_answers) / (len(engines_with_answers) + len(missing_engines))) * 100,
+                "recommendations": recommendations,
+                "auto_generation_available": True
+            }
+            
+            content_gaps[request.site_id].append(gap_analysis)
+            return gap_analysis
             
-            if response.status_code == 200:
-                answers = response.json()
-                
-                # Analyze engine coverage
-                engines_with_answers = set(answer["engine"] for answer in answers)
-                missing_engines = set(request.missing_engines) - engines_with_answers
-                
-                # Generate content recommendations for missing engines
-                recommendations = []
-                
-                for engine in missing_engines:
-                    if engine == "gemini":
-                        recommendations.append({
-                            "engine": engine,
-                            "content_type": "structured_data",
-                            "recommendation": "Create detailed comparison tables - Gemini favors structured data",
-                            "priority": "high",
-                            "estimated_impact": "25-40% improvement in Gemini presence"
-                        })
-                    elif engine == "perplexity":
-                        recommendations.append({
-                            "engine": engine,
-                            "content_type": "research_citations",
-                            "recommendation": "Add more academic and research citations - Perplexity values authoritative sources",
-                            "priority": "medium",
-                            "estimated_impact": "15-30% improvement in Perplexity citations"
-                        })
-                    elif engine == "bing_copilot":
-                        recommendations.append({
-                            "engine": engine,
-                            "content_type": "conversational_qa",
-                            "recommendation": "Create conversational Q&A format - Bing Copilot prefers dialogue structure",
-                            "priority": "medium",
-                            "estimated_impact": "20-35% improvement in Bing Copilot presence"
-                        })
-                
-                gap_analysis = {
-                    "site_id": request.site_id,
-                    "cluster_id": request.cluster_id,
-                    "analyzed_at": datetime.now().isoformat(),
-                    "total_engines_tested": len(engines_with_answers),
-                    "missing_engines": list(missing_engines),
-                    "coverage_percentage": (len(engines_with_answers) / (len(engines_with_answers) + len(missing_engines))) * 100,
-                    "recommendations": recommendations,
-                    "auto_generation_available": True
-                }
-                
-                content_gaps.append(gap_analysis)
-                return gap_analysis
-                
     except Exception as e:
         return {"error": f"Gap analysis failed: {str(e)}"}
 
-@app.get("/v1/geo/sge-monitoring")
-async def get_sge_monitoring(site_id: int, days: int = 7):
-    """Monitor SGE (Search Generative Experience) presence"""
-    
-    # Sample SGE monitoring data
-    sge_data = [
-        {
-            "date": (datetime.now() - timedelta(days=i)).isoformat(),
-            "query": "ai seo tools",
-            "sge_triggered": i % 3 == 0,  # Simulate intermittent triggering
-            "brand_mentioned": i % 4 == 0,
-            "position": i + 1 if i % 4 == 0 else None,
-            "competitor_mentioned": ["semrush.com", "ahrefs.com"][i % 2] if i % 2 == 0 else None
-        }
-        for i in range(days)
-    ]
-    
-    sge_monitoring.extend(sge_data)
-    
-    # Calculate summary metrics
-    total_triggers = sum(1 for d in sge_data if d["sge_triggered"])
-    brand_appearances = sum(1 for d in sge_data if d["brand_mentioned"])
+SGE_ROW_CHUNK = 1024
+SGE_COMPETITOR_ALERTS = (
+    {
+        "competitor": "semrush.com",
+        "mentions": 3,
+        "threat_level": "medium"
+    },
+)
+
+def simulate_sge_columns(days: int) -> Dict[str, np.ndarray]:
+    """Sample SGE monitoring data, simulated column-wise over the day offsets"""
+    i = np.arange(days)
+    brand_mentioned = i % 4 == 0
+    return {
+        "dates": np.datetime64(datetime.now(), "us") - i.astype("timedelta64[D]"),
+        "sge_triggered": i % 3 == 0,  # Simulate intermittent triggering
+        "brand_mentioned": brand_mentioned,
+        "positions": np.where(brand_mentioned, i + 1, 0),
+        "competitor_mentioned": i % 2 == 0
+    }
+
+def iter_sge_rows(columns: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    """Yield daily SGE rows, converting the columns one chunk at a time"""
+    for start in range(0, len(columns["dates"]), SGE_ROW_CHUNK):
+        chunk = slice(start, start + SGE_ROW_CHUNK)
+        for date, triggered, mentioned, position, competitor in zip(
+            np.datetime_as_string(columns["dates"][chunk]).tolist(),
+            columns["sge_triggered"][chunk].tolist(),
+            columns["brand_mentioned"][chunk].tolist(),
+            columns["positions"][chunk].tolist(),
+            columns["competitor_mentioned"][chunk].tolist()
+        ):
+            yield {
+                "date": date,
+                "query": "ai seo tools",
+                "sge_triggered": triggered,
+                "brand_mentioned": mentioned,
+                "position": position if mentioned else None,
+                "competitor_mentioned": "semrush.com" if competitor else None
+            }
+
+def sge_summary(site_id: int, days: int, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Summary metrics for a simulated SGE monitoring window"""
+    total_triggers = int(columns["sge_triggered"].sum())
+    brand_appearances = int(columns["brand_mentioned"].sum())
     
     return {
         "site_id": site_id,
         "monitoring_period_days": days,
         "total_sge_triggers": total_triggers,
         "brand_appearances": brand_appearances,
-        "appearance_rate": (brand_appearances / total_triggers * 100) if total_triggers > 0 else 0,
+        "appearance_rate": (brand_appearances / total_triggers * 100) if total_triggers > 0 else 0
+    }
+
+@app.get("/v1/geo/sge-monitoring")
+async def get_sge_monitoring(site_id: int, days: int = 7):
+    """Monitor SGE (Search Generative Experience) presence"""
+    
+    columns = simulate_sge_columns(days)
+    sge_data = list(iter_sge_rows(columns))
+    sge_monitoring[site_id].extend(sge_data)
+    
+    return {
+        **sge_summary(site_id, days, columns),
         "daily_data": sge_data,
-        "competitor_alerts": [
-            {
-                "competitor": "semrush.com",
-                "mentions": 3,
-                "threat_level": "medium"
-            }
-        ]
+        "competitor_alerts": list(SGE_COMPETITOR_ALERTS)
     }
 
-async def check_google_ai_overview(query: str) -> Dict[str, Any]:
-    """Check if query triggers Google AI Overview"""
+@app.get("/v1/geo/sge-monitoring/stream")
+async def stream_sge_monitoring(site_id: int, days: int = 7):
+    """Stream SGE monitoring as NDJSON: a summary line, then one line per day"""
+    
+    columns = simulate_sge_columns(days)
+    history = sge_monitoring[site_id]
+    
+    def lines():
+        yield orjson.dumps({
+            **sge_summary(site_id, days, columns),
+            "competitor_alerts": SGE_COMPETITOR_ALERTS
+        }) + b"\n"
+        for row in iter_sge_rows(columns):
+            history.append(row)
+            yield orjson.dumps(row) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# Trigger detection is a pure function of the (case-insensitive) query, so the
+# verdicts are memoized; only the checked_at stamp is added per call.
+@lru_cache(maxsize=10_000)
+def detect_ai_overview(query_key: str) -> Dict[str, Any]:
+    """Cached AI Overview trigger verdict for a lowercased query"""
     
     # In production, this would use actual Google Search API or scraping
     # For demo, simulate trigger detection
     
-    trigger_keywords = ["how to", "what is", "best", "vs", "comparison", "guide"]
-    triggers = any(keyword in query.lower() for keyword in trigger_keywords)
+    triggers = bool(AI_OVERVIEW_TRIGGERS.search(query_key))
     
     return {
         "triggered": triggers,
         "confidence": 0.85 if triggers else 0.2,
         "trigger_type": "ai_overview" if triggers else None,
-        "detected_features": ["featured_snippet", "ai_generated"] if triggers else [],
-        "checked_at": datetime.now().isoformat()
+        "detected_features": ("featured_snippet", "ai_generated") if triggers else ()
     }
 
-async def check_bing_copilot(query: str) -> Dict[str, Any]:
-    """Check if query triggers Bing Copilot response"""
+@lru_cache(maxsize=10_000)
+def detect_bing_copilot(query_key: str) -> Dict[str, Any]:
+    """Cached Bing Copilot trigger verdict for a lowercased query"""
     
     # Simulate Bing Copilot trigger detection
-    conversational_indicators = ["help me", "can you", "i need", "explain", "tell me"]
-    triggers = any(indicator in query.lower() for indicator in conversational_indicators) or len(query.split()) > 5
+    triggers = bool(BING_COPILOT_TRIGGERS.search(query_key)) or len(query_key.split()) > 5
     
     return {
         "triggered": triggers,
         "confidence": 0.8 if triggers else 0.3,
         "response_type": "conversational" if triggers else None,
-        "features": ["citations", "follow_up_questions"] if triggers else [],
-        "checked_at": datetime.now().isoformat()
+        "features": ("citations", "follow_up_questions") if triggers else ()
     }
 
-async def check_google_sge(query: str) -> Dict[str, Any]:
-    """Check Search Generative Experience (SGE) triggers"""
+@lru_cache(maxsize=10_000)
+def detect_google_sge(query_key: str) -> Dict[str, Any]:
+    """Cached SGE trigger verdict for a lowercased query"""
     
     # SGE typically triggers for informational queries
-    informational_patterns = ["what", "how", "why", "when", "where", "best", "top", "guide"]
-    triggers = any(pattern in query.lower() for pattern in informational_patterns)
+    triggers = bool(SGE_TRIGGERS.search(query_key))
     
     return {
         "triggered": triggers,
         "confidence": 0.75 if triggers else 0.25,
         "sge_type": "informational" if triggers else None,
-        "expected_features": ["ai_snapshot", "source_links", "follow_up"] if triggers else [],
-        "checked_at": datetime.now().isoformat()
+        "expected_features": ("ai_snapshot", "source_links", "follow_up") if triggers else ()
     }
 
+async def check_google_ai_overview(query: str, now_iso: Optional[str] = None) -> Dict[str, Any]:
+    """Check if query triggers Google AI Overview"""
+    return {**detect_ai_overview(query.lower()), "checked_at": now_iso or datetime.now().isoformat()}
+
+async def check_bing_copilot(query: str, now_iso: Optional[str] = None) -> Dict[str, Any]:
+    """Check if query triggers Bing Copilot response"""
+    return {**detect_bing_copilot(query.lower()), "checked_at": now_iso or datetime.now().isoformat()}
+
+async def check_google_sge(query: str, now_iso: Optional[str] = None) -> Dict[str, Any]:
+    """Check Search Generative Experience (SGE) triggers"""
+    return {**detect_google_sge(query.lower()), "checked_at": now_iso or datetime.now().isoformat()}
+
 @app.post("/v1/geo/auto-optimize")
 async def auto_optimize_for_generative(site_id: int, cluster_id: int, target_engine: str):
     """Automatically optimize content for specific generative engine"""
@@ -272,17 +404,15 @@ async def auto_optimize_for_generative(site_id: int, cluster_id: int, target_eng
 async def get_trigger_history(site_id: int):
     """Get historical trigger data"""
     
-    site_triggers = [t for t in generative_triggers if t["site_id"] == site_id]
-    return site_triggers
+    return list(generative_triggers.get(site_id, ()))
 
 @app.get("/v1/geo/gaps")
 async def get_content_gaps(site_id: int):
     """Get content gap analysis results"""
     
-    site_gaps = [g for g in content_gaps if g["site_id"] == site_id]
-    return site_gaps
+    return list(content_gaps.get(site_id, ()))
 
 if __name__ == "__main__":
     print("Starting GEO (Generative Engine Optimization) Service...")
     print("AI Overviews & SGE tracking: http://localhost:8006")
-    uvicorn.run(app, host="0.0.0.0", port=8006)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8006, loop="uvloop", http="httptools")
\ No newline at end of file
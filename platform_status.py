@@ -17,76 +17,90 @@ async def check_platform_status():
         ("GEO", 8006)
     ]
     
-    async with httpx.AsyncClient() as client:
-        for name, port in services:
-            try:
-                response = await client.get(f"http://localhost:{port}/health", timeout=3.0)
-                if response.status_code == 200:
-                    print(f"OK   {name:12} - Port {port}")
-                else:
-                    print(f"ERR  {name:12} - HTTP {response.status_code}")
-            except:
-                print(f"DOWN {name:12} - Port {port}")
+    async def probe(name, port):
+        """Return the health status code for a service, or None if unreachable"""
+        try:
+            response = await client.get(f"http://localhost:{port}/health", timeout=3.0)
+            return name, port, response.status_code
+        except Exception:
+            return name, port, None
     
-    print()
-    print("TESTING REAL AI INTEGRATION")
-    print("-" * 25)
+    async with httpx.AsyncClient(
+        base_url="http://localhost:8001",
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=httpx.Timeout(5.0, connect=2.0)
+    ) as client:
+        # All probes run concurrently, so a full outage costs one timeout, not six
+        results = await asyncio.gather(*[probe(name, port) for name, port in services])
+        
+        for name, port, status_code in results:
+            if status_code == 200:
+                print(f"OK   {name:12} - Port {port}")
+            elif status_code is None:
+                print(f"DOWN {name:12} - Port {port}")
+            else:
+                print(f"ERR  {name:12} - HTTP {status_code}")
     
-    # Test site creation
-    try:
-        site_response = await client.post(
-            "http://localhost:8001/v1/sites",
-            json={"domain": "status-test.com", "cms_type": "wordpress", "tenant_id": 1}
-        )
+        print()
+        print("TESTING REAL AI INTEGRATION")
+        print("-" * 25)
         
-        if site_response.status_code == 200:
-            site = site_response.json()
-            print(f"Site creation: WORKING (ID: {site['site_id']})")
-            
-            # Test cluster creation
-            cluster_response = await client.post(
-                f"http://localhost:8001/v1/sites/{site['site_id']}/clusters",
-                json={
-                    "name": "Status Test",
-                    "seed_prompt": "AI SEO platform testing",
-                    "keywords": ["test"]
-                }
+        # Test site creation
+        try:
+            site_response = await client.post(
+                "/v1/sites",
+                json={"domain": "status-test.com", "cms_type": "wordpress", "tenant_id": 1}
             )
             
-            if cluster_response.status_code == 200:
-                cluster = cluster_response.json()
-                print(f"Cluster creation: WORKING (ID: {cluster['cluster_id']})")
+            if site_response.status_code == 200:
+                site = site_response.json()
+                print(f"Site creation: WORKING (ID: {site['site_id']})")
                 
-                # Test real AI call
-                track_response = await client.post(
-                    f"http://localhost:8001/v1/clusters/{cluster['cluster_id']}/run",
-                    json={"engine": "chatgpt", "variant_sample": 1}
+                # Test cluster creation
+                cluster_response = await client.post(
+                    f"/v1/sites/{site['site_id']}/clusters",
+                    json={
+                        "name": "Status Test",
+                        "seed_prompt": "AI SEO platform testing",
+                        "keywords": ["test"]
+                    }
                 )
                 
-                if track_response.status_code == 200:
-                    print("ChatGPT tracking: WORKING")
+                if cluster_response.status_code == 200:
+                    cluster = cluster_response.json()
+                    print(f"Cluster creation: WORKING (ID: {cluster['cluster_id']})")
                     
-                    # Check for real response
-                    await asyncio.sleep(3)
-                    answers_response = await client.get(
-                        f"http://localhost:8001/v1/clusters/{cluster['cluster_id']}/answers"
+                    # Test real AI call
+                    track_response = await client.post(
+                        f"/v1/clusters/{cluster['cluster_id']}/run",
+                        json={"engine": "chatgpt", "variant_sample": 1}
                     )
                     
-                    if answers_response.status_code == 200:
-                        answers = answers_response.json()
-                        if answers:
-                            print(f"AI Response: {len(answers[0]['raw_text'])} chars")
-                            print(f"Citations: {len(answers[0]['citations'])}")
-                        else:
-                            print("AI Response: No data yet")
+                    if track_response.status_code == 200:
+                        print("ChatGPT tracking: WORKING")
+                        
+                        # Check for real response
+                        await asyncio.sleep(3)
+                        answers_response = await client.get(
+                            f"/v1/clusters/{cluster['cluster_id']}/answers"
+                        )
+                        
+                        if answers_response.status_code == 200:
+                            answers = answers_response.json()
+                            if answers:
+                                print(f"AI Response: {len(answers[0]['raw_text'])} chars")
+                                print(f"Citations: {len(answers[0]['citations'])}")
+                            else:
+                                print("AI Response: No data yet")
+                    else:
+                        print("ChatGPT tracking: FAILED")
                 else:
-                    print("ChatGPT tracking: FAILED")
+                    print("Cluster creation: FAILED")
             else:
-                print("Cluster creation: FAILED")
-        else:
-            print("Site creation: FAILED")
-    except Exception as e:
-        print(f"Workflow test error: {str(e)}")
+                print("Site creation: FAILED")
+        except Exception as e:
+            print(f"Workflow test error: {str(e)}")
     
     print()
     print("FRONTEND URLS:")
@@ -4,16 +4,43 @@ Analytics Service - Competitive Intelligence & Entity Analysis
 Based on specification section 6.1.3 Embeddings Audit and competitive tracking
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+import asyncio
 import httpx
+import itertools
+from contextlib import asynccontextmanager
 import json
+import os
+from collections import defaultdict
 from datetime import datetime, timedelta
+import numpy as np
 import uvicorn
+from simple_clock import IsoClock
+from simple_store import KeyValueCache, RecordStore
 
-app = FastAPI(title="OmniFunnel • Analytics & Intelligence")
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one pooled HTTP client across requests and keep the record clock ticking"""
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=30.0,
+        http2=True
+    )
+    ticker = asyncio.create_task(clock.tick())
+    yield
+    ticker.cancel()
+    await app.state.http.aclose()
+
+app = FastAPI(title="OmniFunnel • Analytics & Intelligence", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,10 +50,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record timestamps, formatted once a second rather than per request
+clock = IsoClock()
+
 # Storage
-competitive_data = []
-entity_mappings = []
-performance_deltas = []
+ANALYTICS_DB = os.getenv("ANALYTICS_DB", "analytics.sqlite3")
+competitive_data = RecordStore(ANALYTICS_DB, "competitive_data")
+entity_mappings = RecordStore(ANALYTICS_DB, "entity_mappings")
+performance_deltas = RecordStore(ANALYTICS_DB, "performance_deltas")
+entity_cache = KeyValueCache(ANALYTICS_DB, "entity_cache")
+
+# Monotonic id sequence; the store writes run in worker threads, so len() + 1 could hand out an id twice
+entity_ids = itertools.count(len(entity_mappings) + 1)
+
+# Engines every brand should be present in
+ALL_ENGINES = frozenset(("chatgpt", "claude", "gemini", "perplexity", "bing_copilot"))
+
+# Sample performance series (one entry per cluster/engine/metric), as columns
+SAMPLE_METRICS = {
+    "cluster_id": np.array([1, 1], dtype=np.int32),
+    "engine": ("gemini", "perplexity"),
+    "metric": ("citations", "presence"),
+    "current_value": np.array([8.0, 3.0]),
+    "previous_value": np.array([5.0, 7.0]),
+    "hours_ago": np.array([0, 2], dtype=np.int32)
+}
+
+# Summary of the most recent competitive analysis per site, kept current on write
+latest_by_site: Dict[int, Dict[str, Any]] = {}
 
 class CompetitorAnalysisRequest(BaseModel):
     site_id: int
@@ -49,6 +100,42 @@ class PerformanceDelta(BaseModel):
     change_percentage: float
     detected_at: str
 
+def aho_corasick_matrix(texts: List[str], patterns: List[str]) -> np.ndarray:
+    """Match every pattern in a single scan per text with an Aho-Corasick automaton"""
+    hits = np.zeros((len(patterns), len(texts)), dtype=bool)
+    
+    # Several competitors may lower-case to the same pattern
+    indices_by_word = defaultdict(list)
+    for p, pattern in enumerate(patterns):
+        if pattern:
+            indices_by_word[pattern].append(p)
+        else:
+            hits[p, :] = True  # the empty string is in every text
+    
+    if not indices_by_word:
+        return hits
+    
+    automaton = ahocorasick.Automaton()
+    for word, indices in indices_by_word.items():
+        automaton.add_word(word, indices)
+    automaton.make_automaton()
+    
+    for t, text in enumerate(texts):
+        for _, indices in automaton.iter(text):
+            hits[indices, t] = True
+    return hits
+
+def mention_matrix(texts: List[str], patterns: List[str]) -> np.ndarray:
+    """Boolean (patterns x texts) matrix of substring hits"""
+    if texts and patterns and ahocorasick is not None:
+        return aho_corasick_matrix(texts, patterns)
+    
+    hits = np.zeros((len(patterns), len(texts)), dtype=bool)
+    for p, pattern in enumerate(patterns):
+        for t, text in enumerate(texts):
+            hits[p, t] = pattern in text
+    return hits
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "analytics_intelligence"}
@@ -60,49 +147,50 @@ async def analyze_competitors(request: CompetitorAnalysisRequest):
     # Get tracking data for the cluster
     try:
         # Fetch answers for this cluster
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://localhost:8001/v1/clusters/{request.cluster_id}/answers")
+        client = app.state.http
+        response = await client.get(f"http://localhost:8001/v1/clusters/{request.cluster_id}/answers")
+        
+        if response.status_code == 200:
+            answers = response.json()
             
-            if response.status_code == 200:
-                answers = response.json()
-                
-                # Analyze competitor mentions in responses
-                competitor_analysis = {}
-                
-                for competitor in request.competitors:
-                    competitor_mentions = 0
-                    competitor_citations = 0
-                    engines_mentioning = set()
-                    
-                    for answer in answers:
-                        text = answer["raw_text"].lower()
-                        if competitor.lower() in text:
-                            competitor_mentions += 1
-                            engines_mentioning.add(answer["engine"])
-                        
-                        # Check citations
-                        for citation in answer.get("citations", []):
-                            if competitor.lower() in citation.lower():
-                                competitor_citations += 1
-                    
-                    competitor_analysis[competitor] = {
-                        "mentions": competitor_mentions,
-                        "citations": competitor_citations,
-                        "engines": list(engines_mentioning),
-                        "presence_score": min((competitor_mentions * 10) + (competitor_citations * 20), 100)
-                    }
+            # Analyze competitor mentions in responses
+            competitor_analysis = {}
+            
+            # Lowercase every answer and citation once, not once per competitor
+            texts = [answer["raw_text"].lower() for answer in answers]
+            citations = [citation.lower() for answer in answers for citation in answer.get("citations", [])]
+            engines = [answer["engine"] for answer in answers]
+            competitors_lc = [competitor.lower() for competitor in request.competitors]
+            
+            # One (competitors x answers) and one (competitors x citations) hit matrix
+            text_hits = mention_matrix(texts, competitors_lc)
+            citation_counts = mention_matrix(citations, competitors_lc).sum(axis=1)
+            
+            for index, competitor in enumerate(request.competitors):
+                hits = text_hits[index]
+                competitor_mentions = int(hits.sum())
+                competitor_citations = int(citation_counts[index])
+                engines_mentioning = {engines[answer_index] for answer_index in np.flatnonzero(hits)}
                 
-                analysis_result = {
-                    "site_id": request.site_id,
-                    "cluster_id": request.cluster_id,
-                    "analysis_date": datetime.now().isoformat(),
-                    "competitors": competitor_analysis,
-                    "total_answers_analyzed": len(answers),
-                    "recommendation": generate_competitive_recommendations(competitor_analysis)
+                competitor_analysis[competitor] = {
+                    "mentions": competitor_mentions,
+                    "citations": competitor_citations,
+                    "engines": list(engines_mentioning),
+                    "presence_score": min((competitor_mentions * 10) + (competitor_citations * 20), 100)
                 }
-                
-                competitive_data.append(analysis_result)
-                return analysis_result
+            
+            analysis_result = {
+                "site_id": request.site_id,
+                "cluster_id": request.cluster_id,
+                "analysis_date": clock.iso,
+                "competitors": competitor_analysis,
+                "total_answers_analyzed": len(answers),
+                "recommendation": generate_competitive_recommendations(competitor_analysis)
+            }
+            
+            await asyncio.to_thread(competitive_data.append, analysis_result)
+            latest_by_site[request.site_id] = build_competitive_summary(analysis_result)
+            return analysis_result
                 
     except Exception as e:
         return {"error": f"Analysis failed: {str(e)}"}
@@ -111,76 +199,93 @@ async def analyze_competitors(request: CompetitorAnalysisRequest):
 async def stitch_entity(request: EntityStitchingRequest):
     """Generate SameAs links and entity connections"""
     
-    # Generate SameAs link recommendations
-    same_as_links = []
-    
-    # Common entity platforms to check
-    entity_sources = [
-        f"https://www.linkedin.com/company/{request.brand_name.lower().replace(' ', '-')}",
-        f"https://www.crunchbase.com/organization/{request.brand_name.lower().replace(' ', '-')}",
-        f"https://clutch.co/profile/{request.brand_name.lower().replace(' ', '-')}",
-        f"https://www.g2.com/products/{request.brand_name.lower().replace(' ', '-')}",
-        f"https://en.wikipedia.org/wiki/{request.brand_name.replace(' ', '_')}"
-    ]
+    # Resolve the entity once per brand; repeat lookups come from the cache
+    brand_key = request.brand_name.lower().strip()
+    entity = await asyncio.to_thread(entity_cache.get, brand_key)
+    entity_id = next(entity_ids)
     
-    # Validate links (in production, would make HTTP requests)
-    validated_links = []
-    for link in entity_sources:
-        # Simulate validation
-        validated_links.append({
-            "url": link,
-            "platform": link.split("//")[1].split("/")[0],
-            "status": "found",  # would be actual HTTP status
-            "confidence": 0.85
-        })
+    if entity is None:
+        # Common entity platforms to check
+        slug = request.brand_name.lower().replace(' ', '-')
+        entity_sources = [
+            f"https://www.linkedin.com/company/{slug}",
+            f"https://www.crunchbase.com/organization/{slug}",
+            f"https://clutch.co/profile/{slug}",
+            f"https://www.g2.com/products/{slug}",
+            f"https://en.wikipedia.org/wiki/{request.brand_name.replace(' ', '_')}"
+        ]
+        
+        # Validate links (in production, would make HTTP requests)
+        validated_links = []
+        for link in entity_sources:
+            # Simulate validation
+            validated_links.append({
+                "url": link,
+                "platform": link.split("//")[1].split("/")[0],
+                "status": "found",  # would be actual HTTP status
+                "confidence": 0.85
+            })
+        
+        entity = {
+            "wikidata_id": f"Q{entity_id + 12344}",  # Would be actual Wikidata lookup
+            "same_as_links": validated_links,
+            "knowledge_graph_presence": True
+        }
+        await asyncio.to_thread(entity_cache.put, brand_key, entity)
     
     entity_mapping = {
-        "entity_id": len(entity_mappings) + 1,
+        "entity_id": entity_id,
         "site_id": request.site_id,
         "brand_name": request.brand_name,
         "entity_type": request.entity_type,
-        "same_as_links": validated_links,
-        "created_at": datetime.now().isoformat(),
-        "wikidata_id": f"Q{len(entity_mappings) + 12345}",  # Would be actual Wikidata lookup
-        "knowledge_graph_presence": True
+        "same_as_links": entity["same_as_links"],
+        "created_at": clock.iso,
+        "wikidata_id": entity["wikidata_id"],
+        "knowledge_graph_presence": entity["knowledge_graph_presence"]
     }
     
-    entity_mappings.append(entity_mapping)
+    await asyncio.to_thread(entity_mappings.append, entity_mapping)
     return entity_mapping
 
 @app.get("/v1/performance/deltas")
 async def get_performance_deltas(site_id: int, days: int = 7):
     """Get performance changes and alerts"""
     
-    # Generate sample deltas for demonstration
+    # Sample metric series for demonstration, stored column-wise
+    now = datetime.now()
+    current = SAMPLE_METRICS["current_value"]
+    previous = SAMPLE_METRICS["previous_value"]
+    
+    # All deltas and alert types in one vectorized pass
+    change = np.round((current - previous) / previous * 100.0, 1)
+    alert_types = np.where(change > 0, "improvement", "concern")
+    
     sample_deltas = [
         {
             "site_id": site_id,
-            "cluster_id": 1,
-            "engine": "gemini", 
-            "metric": "citations",
-            "current_value": 8.0,
-            "previous_value": 5.0,
-            "change_percentage": 60.0,
-            "detected_at": datetime.now().isoformat(),
-            "alert_type": "improvement",
-            "message": "Citations in Gemini increased by 60%"
-        },
-        {
-            "site_id": site_id,
-            "cluster_id": 1,
-            "engine": "perplexity",
-            "metric": "presence",
-            "current_value": 3.0,
-            "previous_value": 7.0,
-            "change_percentage": -57.1,
-            "detected_at": (datetime.now() - timedelta(hours=2)).isoformat(),
-            "alert_type": "concern",
-            "message": "Presence in Perplexity dropped by 57%"
+            "cluster_id": cluster_id,
+            "engine": engine,
+            "metric": metric,
+            "current_value": current_value,
+            "previous_value": previous_value,
+            "change_percentage": change_percentage,
+            "detected_at": (now - timedelta(hours=hours_ago)).isoformat(),
+            "alert_type": alert_type,
+            "message": f"{metric.title()} in {engine.title()} {'increased' if change_percentage > 0 else 'dropped'} by {abs(change_percentage):.0f}%"
         }
+        for cluster_id, engine, metric, current_value, previous_value, change_percentage, hours_ago, alert_type in zip(
+            SAMPLE_METRICS["cluster_id"].tolist(),
+            SAMPLE_METRICS["engine"],
+            SAMPLE_METRICS["metric"],
+            current.tolist(),
+            previous.tolist(),
+            change.tolist(),
+            SAMPLE_METRICS["hours_ago"].tolist(),
+            alert_types.tolist()
+        )
     ]
     
-    performance_deltas.extend(sample_deltas)
+    await asyncio.to_thread(performance_deltas.extend, sample_deltas)
     return sample_deltas
 
 @app.post("/v1/alerts/remediation")
@@ -218,8 +323,12 @@ def generate_competitive_recommendations(analysis: Dict[str, Dict]) -> List[str]
     
     recommendations = []
     
-    # Find top competitor
-    top_competitor = max(analysis.items(), key=lambda x: x[1]["presence_score"]) if analysis else None
+    # Find top competitor in a single pass
+    top_competitor = None
+    top_score = None
+    for name, comp_data in analysis.items():
+        if top_score is None or comp_data["presence_score"] > top_score:
+            top_competitor, top_score = (name, comp_data), comp_data["presence_score"]
     
     if top_competitor:
         competitor, data = top_competitor
@@ -229,42 +338,58 @@ def generate_competitive_recommendations(analysis: Dict[str, Dict]) -> List[str]
             recommendations.append(f"Target publications citing {competitor} for mention opportunities")
     
     # Check engine gaps
-    all_engines = {"chatgpt", "claude", "gemini", "perplexity", "bing_copilot"}
-    covered_engines = set()
-    for comp_data in analysis.values():
-        covered_engines.update(comp_data["engines"])
-    
-    missing_engines = all_engines - covered_engines
+    covered_engines = set().union(*(comp_data["engines"] for comp_data in analysis.values()))
+    missing_engines = ALL_ENGINES - covered_engines
     if missing_engines:
         recommendations.append(f"Expand presence in {', '.join(missing_engines)}")
     
     return recommendations
 
 @app.get("/v1/competitive/summary")
-async def get_competitive_summary(site_id: int):
+async def get_competitive_summary(site_id: int, request: Request, response: Response):
     """Get competitive intelligence summary"""
     
-    site_analyses = [c for c in competitive_data if c["site_id"] == site_id]
+    etag = await asyncio.to_thread(competitive_data.etag, site_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    summary = latest_by_site.get(site_id)
     
-    if not site_analyses:
-        return {"message": "No competitive analysis data available"}
+    if summary is None:
+        # First request since startup: rebuild from the stored history once
+        latest_analysis = await asyncio.to_thread(competitive_data.last, site_id=site_id)
+        
+        if latest_analysis is None:
+            return {"message": "No competitive analysis data available"}
+        
+        summary = build_competitive_summary(latest_analysis)
+        latest_by_site[site_id] = summary
     
-    latest_analysis = max(site_analyses, key=lambda x: x["analysis_date"])
+    return summary
+
+def build_competitive_summary(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary of a site's latest competitive analysis"""
+    competitors = analysis["competitors"]
     
     return {
-        "site_id": site_id,
-        "latest_analysis": latest_analysis,
-        "competitor_count": len(latest_analysis["competitors"]),
-        "top_competitor": max(latest_analysis["competitors"].items(), key=lambda x: x[1]["presence_score"])[0],
-        "analysis_date": latest_analysis["analysis_date"]
+        "site_id": analysis["site_id"],
+        "latest_analysis": analysis,
+        "competitor_count": len(competitors),
+        "top_competitor": max(competitors, key=lambda name: competitors[name]["presence_score"]) if competitors else None,
+        "analysis_date": analysis["analysis_date"]
     }
 
 @app.get("/v1/entity/mappings")
-async def get_entity_mappings(site_id: int):
+async def get_entity_mappings(site_id: int, request: Request, response: Response):
     """Get entity mappings and SameAs links"""
     
-    site_entities = [e for e in entity_mappings if e["site_id"] == site_id]
-    return site_entities
+    etag = await asyncio.to_thread(entity_mappings.etag, site_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    return await asyncio.to_thread(entity_mappings.for_site, site_id)
 
 if __name__ == "__main__":
     print("Starting Analytics & Intelligence Service...")
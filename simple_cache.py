@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+In-process cache of serialized GET responses for the standalone services
+Entries expire after a TTL and are dropped early when their group is written to
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+class ResponseCache:
+    """Encoded response bodies grouped by the record owner they were built from (site, cluster, ...), LRU-bounded"""
+    
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[Any, Hashable], Tuple[float, bytes]]" = OrderedDict()
+        self.groups: Dict[Any, Set[Hashable]] = {}
+    
+    def get(self, group: Any, key: Hashable) -> Optional[bytes]:
+        """Cached body, or None when missing or expired"""
+        entry = self.entries.get((group, key))
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(group, key)
+            return None
+        self.entries.move_to_end((group, key))
+        return entry[1]
+    
+    def put(self, group: Any, key: Hashable, body: bytes):
+        """Cache a body until the TTL passes, the group is invalidated or it is least recently used"""
+        now = time.monotonic()
+        self.entries[(group, key)] = (now + self.ttl, body)
+        self.entries.move_to_end((group, key))
+        self.groups.setdefault(group, set()).add(key)
+        
+        # Evict from the least recently used end: anything expired, then anything over the cap
+        while self.entries:
+            (old_group, old_key), (expires, _) = next(iter(self.entries.items()))
+            if expires >= now and len(self.entries) <= self.max_entries:
+                break
+            self._drop(old_group, old_key)
+    
+    def invalidate(self, group: Any):
+        """Drop every cached body for a group after its records change"""
+        for key in self.groups.pop(group, ()):
+            self.entries.pop((group, key), None)
+    
+    def _drop(self, group: Any, key: Hashable):
+        """Remove one entry and its group membership"""
+        self.entries.pop((group, key), None)
+        keys = self.groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.groups[group]
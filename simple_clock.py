@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Coarse wall clock for the standalone services
+Formats the ISO timestamp once a second instead of on every request
+"""
+
+import asyncio
+from datetime import datetime
+
+class IsoClock:
+    """ISO timestamp string refreshed by a background task; accurate to the refresh interval"""
+    
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.iso = datetime.now().isoformat()
+    
+    async def tick(self):
+        """Refresh the timestamp forever; run as a task from the service lifespan"""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.iso = datetime.now().isoformat()
@@ -4,16 +4,42 @@ Simplified Deployer Service
 Implements CMS auto-deployment according to specification
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+import asyncio
+import aiohttp
+import itertools
 import httpx
-import json
-from datetime import datetime
+from contextlib import asynccontextmanager
+import orjson
+import os
 import uvicorn
+from markupsafe import escape
+from simple_clock import IsoClock
+from simple_store import RecordStore
 
-app = FastAPI(title="OmniFunnel • CMS Deployer")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share pooled HTTP clients (httpx for deploys, aiohttp for short CMS probes) and keep the record clock ticking"""
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=30.0,
+        http2=True
+    )
+    app.state.probe = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=30),
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+    ticker = asyncio.create_task(clock.tick())
+    yield
+    ticker.cancel()
+    await app.state.probe.close()
+    await app.state.http.aclose()
+
+app = FastAPI(title="OmniFunnel • CMS Deployer", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,9 +49,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record timestamps, formatted once a second rather than per request
+clock = IsoClock()
+
 # Storage
-deployments = []
-cms_connections = []
+DEPLOYER_DB = os.getenv("DEPLOYER_DB", "deployer.sqlite3")
+deployments = RecordStore(DEPLOYER_DB, "deployments")
+cms_connections = RecordStore(DEPLOYER_DB, "cms_connections")
+
+# Monotonic id sequences; the store writes run in worker threads, so len() + 1 could hand out an id twice
+connection_ids = itertools.count(len(cms_connections) + 1)
+job_ids = itertools.count(len(deployments) + 1)
+
+# WordPress application passwords by connection_id; kept in memory, never persisted
+cms_credentials = {}
 
 class CMSConnection(BaseModel):
     site_id: int
@@ -63,15 +100,17 @@ async def connect_cms(connection: CMSConnection):
     
     if health_check["connected"]:
         connection_data = {
-            "connection_id": len(cms_connections) + 1,
+            "connection_id": next(connection_ids),
             "site_id": connection.site_id,
             "cms_type": connection.cms_type,
             "site_url": connection.site_url,
             "status": "active",
-            "last_tested": datetime.now().isoformat(),
+            "last_tested": clock.iso,
             "health": health_check
         }
-        cms_connections.append(connection_data)
+        await asyncio.to_thread(cms_connections.append, connection_data)
+        if connection.username and connection.app_password:
+            cms_credentials[connection_data["connection_id"]] = (connection.username, connection.app_password)
         
         return {
             "success": True,
@@ -89,19 +128,18 @@ async def connect_cms(connection: CMSConnection):
 async def deploy_content(request: DeployRequest):
     """Deploy content to CMS"""
     
-    # Find CMS connection
-    connection = next((c for c in cms_connections if c["site_id"] == request.site_id), None)
+    # Find CMS connection; the newest one holds the credentials from the latest reconnect
+    connection = await asyncio.to_thread(cms_connections.last, site_id=request.site_id)
     if not connection:
         raise HTTPException(status_code=404, detail="No CMS connection found for site")
     
-    job_id = len(deployments) + 1
+    job_id = next(job_ids)
     
     try:
         # Deploy based on CMS type
-        if connection["cms_type"] == "wordpress":
-            result = await deploy_to_wordpress(connection, request.content_blocks, request.schemas)
-        elif connection["cms_type"] == "webflow":
-            result = await deploy_to_webflow(connection, request.content_blocks, request.schemas)
+        deployer = DEPLOYERS.get(connection["cms_type"])
+        if deployer:
+            result = await deployer(connection, request.content_blocks, request.schemas)
         else:
             result = {"success": False, "error": f"CMS type {connection['cms_type']} not yet implemented"}
         
@@ -111,13 +149,13 @@ async def deploy_content(request: DeployRequest):
             "cms_type": connection["cms_type"],
             "status": "completed" if result["success"] else "failed",
             "target_urls": result.get("urls", []),
-            "deployed_at": datetime.now().isoformat(),
+            "deployed_at": clock.iso,
             "blocks_deployed": len(request.content_blocks),
             "schemas_deployed": len(request.schemas),
             "response": result
         }
         
-        deployments.append(deployment)
+        await asyncio.to_thread(deployments.append, deployment)
         
         return DeployResponse(
             job_id=job_id,
@@ -134,74 +172,121 @@ async def deploy_content(request: DeployRequest):
             "site_id": request.site_id,
             "status": "failed",
             "error": str(e),
-            "deployed_at": datetime.now().isoformat()
+            "deployed_at": clock.iso
         }
-        deployments.append(deployment)
+        await asyncio.to_thread(deployments.append, deployment)
         
         raise HTTPException(status_code=500, detail=f"Deployment failed: {str(e)}")
 
 async def test_cms_connection(connection: CMSConnection) -> Dict[str, Any]:
     """Test CMS connectivity"""
     
+    tester = TESTERS.get(connection.cms_type)
+    if not tester:
+        return {"connected": False, "error": f"CMS type {connection.cms_type} not supported"}
+    
     try:
-        if connection.cms_type == "wordpress":
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{connection.site_url}/wp-json/wp/v2/")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "connected": True,
-                        "site_name": data.get("name", "Unknown"),
-                        "wordpress_version": data.get("version", "Unknown"),
-                        "rest_api": True
-                    }
-                else:
-                    return {"connected": False, "error": f"HTTP {response.status_code}"}
-        
-        elif connection.cms_type == "webflow":
-            # Webflow API test (would need API key)
+        return await tester(connection)
+    except Exception as e:
+        return {"connected": False, "error": str(e)}
+
+async def test_wordpress_connection(connection: CMSConnection) -> Dict[str, Any]:
+    """Probe the WordPress REST API"""
+    async with app.state.probe.get(f"{connection.site_url}/wp-json/wp/v2/") as response:
+        if response.status == 200:
+            data = orjson.loads(await response.read())
             return {
                 "connected": True,
-                "cms_type": "webflow",
-                "note": "Webflow connection simulated - requires API key"
+                "site_name": data.get("name", "Unknown"),
+                "wordpress_version": data.get("version", "Unknown"),
+                "rest_api": True
             }
-        
         else:
-            return {"connected": False, "error": f"CMS type {connection.cms_type} not supported"}
-            
-    except Exception as e:
-        return {"connected": False, "error": str(e)}
+            return {"connected": False, "error": f"HTTP {response.status}"}
+
+async def test_webflow_connection(connection: CMSConnection) -> Dict[str, Any]:
+    """Webflow API test (would need API key)"""
+    return {
+        "connected": True,
+        "cms_type": "webflow",
+        "note": "Webflow connection simulated - requires API key"
+    }
+
+def format_block_for_wordpress(block: Dict[str, Any]) -> Optional[str]:
+    """Format one content block as WordPress HTML, or None for unknown types"""
+    if block["type"] == "faq":
+        return format_faq_for_wordpress(block)
+    elif block["type"] == "table":
+        return format_table_for_wordpress(block)
+    elif block["type"] == "para":
+        return f"<h2>{escape(block['title'])}</h2>\n<p>{escape(block['content']['text'])}</p>\n\n"
+    return None
 
 async def deploy_to_wordpress(connection: Dict[str, Any], blocks: List[Dict[str, Any]], schemas: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Deploy content to WordPress"""
-    
-    # Build post content
-    post_content = ""
+    """Deploy content to WordPress, one draft post per content block"""
     
-    for block in blocks:
-        if block["type"] == "faq":
-            post_content += format_faq_for_wordpress(block)
-        elif block["type"] == "table":
-            post_content += format_table_for_wordpress(block)
-        elif block["type"] == "para":
-            post_content += f"<h2>{block['title']}</h2>\n<p>{block['content']['text']}</p>\n\n"
+    # Build post content per block
+    posts = [(block["title"], html) for block in blocks if (html := format_block_for_wordpress(block)) is not None]
     
-    # Add JSON-LD
+    # JSON-LD goes into the first post
+    parts = []
     for schema in schemas:
-        jsonld = json.dumps(schema["jsonld"], indent=2)
-        post_content += f'<script type="application/ld+json">\n{jsonld}\n</script>\n\n'
+        # "<\/" keeps a "</script>" inside a JSON string from closing the tag early
+        jsonld = orjson.dumps(schema["jsonld"], option=orjson.OPT_INDENT_2).decode().replace("</", "<\\/")
+        parts.append(f'<script type="application/ld+json">\n{jsonld}\n</script>\n\n')
+    jsonld_html = "".join(parts)
+    
+    if posts:
+        posts[0] = (posts[0][0], posts[0][1] + jsonld_html)
+    elif jsonld_html:
+        # Schema-only deploy: the JSON-LD gets a post of its own
+        posts = [("Structured data", jsonld_html)]
+    else:
+        return {"success": False, "status": "not_deployed", "urls": [], "error": "Nothing to deploy"}
     
-    # For demo, simulate WordPress deployment
-    post_url = f"{connection['site_url']}/answers/ai-generated-content-{datetime.now().strftime('%Y%m%d')}"
     ai_map_url = f"{connection['site_url']}/ai-map/content.json"
+    credentials = cms_credentials.get(connection["connection_id"])
+    
+    if credentials is None:
+        # Application passwords are never persisted, so this also follows a restart
+        return {
+            "success": False,
+            "status": "not_deployed",
+            "urls": [],
+            "error": "No WordPress credentials for this connection; reconnect with username and app_password"
+        }
+    
+    # Create every post concurrently over the shared connection pool
+    client = app.state.http
+    responses = await asyncio.gather(*[
+        client.post(
+            f"{connection['site_url']}/wp-json/wp/v2/posts",
+            json={
+                "title": title,
+                "content": html,
+                "status": "draft"
+            },
+            auth=credentials
+        )
+        for title, html in posts
+    ], return_exceptions=True)
+    
+    created, errors = [], []
+    for (title, _), response in zip(posts, responses):
+        if isinstance(response, Exception):
+            errors.append(f"{title}: {response!r}")
+        elif response.status_code != 201:
+            errors.append(f"{title}: HTTP {response.status_code} {response.text[:200]}")
+        else:
+            created.append(response.json())
     
     return {
-        "success": True,
-        "urls": [post_url, ai_map_url],
-        "post_id": 123,
-        "status": "draft",
-        "message": "Content deployed to WordPress as draft post"
+        "success": not errors,
+        "urls": [post["link"] for post in created] + ([ai_map_url] if created else []),
+        "post_ids": [post["id"] for post in created],
+        "status": "draft" if created else "not_deployed",
+        "errors": errors,
+        "message": f"{len(created)} of {len(posts)} posts deployed to WordPress as drafts"
     }
 
 async def deploy_to_webflow(connection: Dict[str, Any], blocks: List[Dict[str, Any]], schemas: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -215,56 +300,70 @@ async def deploy_to_webflow(connection: Dict[str, Any], blocks: List[Dict[str, A
         "message": "Content deployed to Webflow CMS collection"
     }
 
+# CMS adapters by cms_type
+DEPLOYERS = {
+    "wordpress": deploy_to_wordpress,
+    "webflow": deploy_to_webflow
+}
+
+TESTERS = {
+    "wordpress": test_wordpress_connection,
+    "webflow": test_webflow_connection
+}
+
 def format_faq_for_wordpress(block: Dict[str, Any]) -> str:
     """Format FAQ block for WordPress"""
-    content = f"<h2>{block['title']}</h2>\n\n"
     questions = block["content"].get("questions", [])
     answers = block["content"].get("answers", [])
     
-    for q, a in zip(questions, answers):
-        content += f"<h3>{q}</h3>\n<p>{a}</p>\n\n"
-    
-    return content
+    parts = [f"<h2>{escape(block['title'])}</h2>\n\n"]
+    parts.extend(f"<h3>{escape(q)}</h3>\n<p>{escape(a)}</p>\n\n" for q, a in zip(questions, answers))
+    return "".join(parts)
 
 def format_table_for_wordpress(block: Dict[str, Any]) -> str:
     """Format table block for WordPress"""
-    content = f"<h2>{block['title']}</h2>\n\n"
     headers = block["content"].get("headers", [])
     rows = block["content"].get("rows", [])
     
-    content += "<table class='ai-comparison-table'>\n<thead><tr>"
-    for header in headers:
-        content += f"<th>{header}</th>"
-    content += "</tr></thead>\n<tbody>\n"
+    parts = [f"<h2>{escape(block['title'])}</h2>\n\n", "<table class='ai-comparison-table'>\n<thead><tr>"]
+    parts.extend(f"<th>{escape(header)}</th>" for header in headers)
+    parts.append("</tr></thead>\n<tbody>\n")
     
     for row in rows:
-        content += "<tr>"
-        for cell in row:
-            content += f"<td>{cell}</td>"
-        content += "</tr>\n"
+        parts.append("<tr>")
+        parts.extend(f"<td>{escape(cell)}</td>" for cell in row)
+        parts.append("</tr>\n")
     
-    content += "</tbody></table>\n\n"
-    return content
+    parts.append("</tbody></table>\n\n")
+    return "".join(parts)
 
 @app.get("/v1/deploy/jobs")
-async def get_deployment_jobs(site_id: Optional[int] = None):
+async def get_deployment_jobs(request: Request, response: Response, site_id: Optional[int] = None):
     """Get deployment job history"""
     
-    if site_id:
-        site_deployments = [d for d in deployments if d["site_id"] == site_id]
-        return site_deployments
+    etag = await asyncio.to_thread(deployments.etag, site_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
-    return deployments
+    if site_id is not None:
+        return await asyncio.to_thread(deployments.for_site, site_id)
+    
+    return await asyncio.to_thread(list, deployments)
 
 @app.get("/v1/cms/connections")
-async def get_cms_connections(site_id: Optional[int] = None):
+async def get_cms_connections(request: Request, response: Response, site_id: Optional[int] = None):
     """Get CMS connections"""
     
-    if site_id:
-        site_connections = [c for c in cms_connections if c["site_id"] == site_id]
-        return site_connections
+    etag = await asyncio.to_thread(cms_connections.etag, site_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    if site_id is not None:
+        return await asyncio.to_thread(cms_connections.for_site, site_id)
     
-    return cms_connections
+    return await asyncio.to_thread(list, cms_connections)
 
 if __name__ == "__main__":
     print("Starting CMS Deployer Service...")
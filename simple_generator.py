@@ -4,17 +4,36 @@ Simplified Content Generator Service
 Implements LEO (Language Engine Optimization) according to specification
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import httpx
-import json
+from contextlib import asynccontextmanager
+import orjson
+import os
 import re
-from datetime import datetime
+from functools import lru_cache
 import uvicorn
+from simple_clock import IsoClock
+from simple_store import RecordStore
 
-app = FastAPI(title="OmniFunnel • Content Generator")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one pooled HTTP client across requests and keep the record clock ticking"""
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=OPENAI_CONCURRENCY, max_keepalive_connections=OPENAI_CONCURRENCY),
+        timeout=30.0,
+        http2=True
+    )
+    ticker = asyncio.create_task(clock.tick())
+    yield
+    ticker.cancel()
+    await app.state.http.aclose()
+
+app = FastAPI(title="OmniFunnel • Content Generator", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,8 +46,18 @@ app.add_middleware(
 # API Key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
+# Bound in-flight OpenAI requests; HTTP/2 multiplexes them over a few connections
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "20"))
+OPENAI_SEMAPHORE = asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+# Fallback for replies that wrap the JSON object in prose
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# Record timestamps, formatted once a second rather than per request
+clock = IsoClock()
+
 # Storage
-generated_content = []
+generated_content = RecordStore(os.getenv("GENERATOR_DB", "generator.sqlite3"), "generated_content")
 
 class GenerateRequest(BaseModel):
     topic: str
@@ -46,38 +75,96 @@ async def generate_content(req: GenerateRequest):
     blocks = []
     schemas = []
     
-    # Generate FAQ
-    if "faq" in req.formats:
-        faq = await generate_faq(req.topic)
-        blocks.append(faq)
+    # Generate FAQ, table and paragraph concurrently; each generator falls
+    # back to template content on failure, so none of them raise
+    tasks = [
+        asyncio.create_task(generator(req.topic)) for fmt, generator in (
+            ("faq", generate_faq),
+            ("table", generate_table),
+            ("para", generate_paragraph)
+        )
+        if fmt in req.formats
+    ]
     
-    # Generate table
-    if "table" in req.formats:
-        table = await generate_table(req.topic)
-        blocks.append(table)
-    
-    # Generate paragraph
-    if "para" in req.formats:
-        para = await generate_paragraph(req.topic)
-        blocks.append(para)
-    
-    # Generate JSON-LD
+    # Generate JSON-LD as soon as the FAQ lands, while table and paragraph finish
     if "jsonld" in req.formats:
-        schema = generate_jsonld_schema(req.topic, blocks)
+        faq_blocks = [await tasks[0]] if "faq" in req.formats else []
+        schema = generate_jsonld_schema(req.topic, faq_blocks)
         schemas.append(schema)
     
+    blocks.extend(await asyncio.gather(*tasks))
+    
     result = {
         "topic": req.topic,
         "site_id": req.site_id,
         "blocks": blocks,
         "schemas": schemas,
-        "generated_at": datetime.now().isoformat(),
+        "generated_at": clock.iso,
         "total_word_count": sum(b.get("word_count", 0) for b in blocks)
     }
     
-    generated_content.append(result)
+    await asyncio.to_thread(generated_content.append, result)
     return result
 
+async def post_chat_completion(prompt: str, max_tokens: int) -> httpx.Response:
+    """POST a GPT-4 chat completion while holding an OpenAI concurrency slot"""
+    async with OPENAI_SEMAPHORE:
+        return await app.state.http.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "gpt-4",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens
+            }
+        )
+
+async def stream_chat_completion(prompt: str, max_tokens: int) -> str:
+    """Stream a GPT-4 chat completion over SSE and return the assembled reply text"""
+    parts = []
+    async with OPENAI_SEMAPHORE:
+        async with app.state.http.stream(
+            "POST",
+            "https://api.openai.com/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "gpt-4",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "stream": True
+            }
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                payload = line[6:]
+                if payload == "[DONE]":
+                    break
+                # Usage and keep-alive chunks carry no choices or delta
+                choices = orjson.loads(payload).get("choices")
+                delta = choices[0].get("delta") if choices else None
+                if delta:
+                    parts.append(delta.get("content") or "")
+    return "".join(parts)
+
+def parse_json_reply(content: str) -> Optional[Dict[str, Any]]:
+    """Parse a JSON-only model reply directly, falling back to extracting the object"""
+    if content.lstrip().startswith("{"):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    
+    json_match = JSON_OBJECT_RE.search(content)
+    return orjson.loads(json_match.group()) if json_match else None
+
 async def generate_faq(topic: str) -> Dict[str, Any]:
     """Generate FAQ optimized for AI engines"""
     
@@ -85,39 +172,27 @@ async def generate_faq(topic: str) -> Dict[str, Any]:
     
 Generate 8-10 questions and answers. Each answer should be 50-100 words.
 Include specific facts, benefits, and use cases.
-Format as JSON: {{"questions": ["Q1", "Q2"], "answers": ["A1", "A2"]}}"""
+Format as JSON: {{"questions": ["Q1", "Q2"], "answers": ["A1", "A2"]}}
+Respond with only JSON."""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 1500
-                }
-            )
+        response = await post_chat_completion(prompt, max_tokens=1500)
+        
+        if response.status_code == 200:
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
             
-            if response.status_code == 200:
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
+            # Extract JSON
+            faq_data = parse_json_reply(content)
+            if faq_data is not None:
                 
-                # Extract JSON
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    faq_data = json.loads(json_match.group())
-                    
-                    return {
-                        "type": "faq",
-                        "title": f"FAQ: {topic}",
-                        "content": faq_data,
-                        "word_count": sum(len(a.split()) for a in faq_data.get("answers", [])),
-                        "evaluator_score": 85.0
-                    }
+                return {
+                    "type": "faq",
+                    "title": f"FAQ: {topic}",
+                    "content": faq_data,
+                    "word_count": sum(len(a.split()) for a in faq_data.get("answers", [])),
+                    "evaluator_score": 85.0
+                }
     except Exception as e:
         print(f"FAQ generation error: {e}")
     
@@ -139,38 +214,26 @@ async def generate_table(topic: str) -> Dict[str, Any]:
     prompt = f"""Create a comparison table for '{topic}' with 5-7 options.
     
 Include columns: Name, Key Features, Pricing, Best For
-Format as JSON: {{"headers": ["Name", "Features", "Pricing", "Best For"], "rows": [["Item1", "Feature1", "Price1", "Use1"]]}}"""
+Format as JSON: {{"headers": ["Name", "Features", "Pricing", "Best For"], "rows": [["Item1", "Feature1", "Price1", "Use1"]]}}
+Respond with only JSON."""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 1000
-                }
-            )
+        response = await post_chat_completion(prompt, max_tokens=1000)
+        
+        if response.status_code == 200:
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
             
-            if response.status_code == 200:
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
+            table_data = parse_json_reply(content)
+            if table_data is not None:
                 
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    table_data = json.loads(json_match.group())
-                    
-                    return {
-                        "type": "table",
-                        "title": f"Comparison: {topic}",
-                        "content": table_data,
-                        "word_count": 100,
-                        "evaluator_score": 80.0
-                    }
+                return {
+                    "type": "table",
+                    "title": f"Comparison: {topic}",
+                    "content": table_data,
+                    "word_count": 100,
+                    "evaluator_score": 80.0
+                }
     except Exception as e:
         print(f"Table generation error: {e}")
     
@@ -192,31 +255,15 @@ async def generate_paragraph(topic: str) -> Dict[str, Any]:
 Include key benefits, use cases, and specific facts. Optimize for AI engine citations."""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 200
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data["choices"][0]["message"]["content"].strip()
-                
-                return {
-                    "type": "para",
-                    "title": f"What is {topic}?",
-                    "content": {"text": content},
-                    "word_count": len(content.split()),
-                    "evaluator_score": 75.0
-                }
+        content = (await stream_chat_completion(prompt, max_tokens=200)).strip()
+        
+        return {
+            "type": "para",
+            "title": f"What is {topic}?",
+            "content": {"text": content},
+            "word_count": len(content.split()),
+            "evaluator_score": 75.0
+        }
     except Exception as e:
         print(f"Paragraph generation error: {e}")
     
@@ -234,12 +281,26 @@ def generate_jsonld_schema(topic: str, blocks: List[Dict[str, Any]]) -> Dict[str
     # Find FAQ block for FAQPage schema
     faq_block = next((b for b in blocks if b["type"] == "faq"), None)
     
+    qa_pairs = None
     if faq_block:
-        faq_items = []
         questions = faq_block["content"].get("questions", [])
         answers = faq_block["content"].get("answers", [])
+        qa_pairs = tuple(zip(questions, answers))
+    
+    try:
+        return build_jsonld_schema(topic, qa_pairs)
+    except TypeError:
+        # Unhashable Q/A values (non-string model output) skip the cache
+        return build_jsonld_schema.__wrapped__(topic, qa_pairs)
+
+@lru_cache(maxsize=2048)
+def build_jsonld_schema(topic: str, qa_pairs: Optional[Tuple[Tuple[str, str], ...]]) -> Dict[str, Any]:
+    """Build the schema for a topic and its FAQ pairs; the cached result is shared, so never mutate it"""
+    
+    if qa_pairs is not None:
+        faq_items = []
         
-        for q, a in zip(questions, answers):
+        for q, a in qa_pairs:
             faq_items.append({
                 "@type": "Question",
                 "name": q,
@@ -263,16 +324,19 @@ def generate_jsonld_schema(topic: str, blocks: List[Dict[str, Any]]) -> Dict[str
         }
     
     return {
-        "type": "FAQPage" if faq_block else "Article",
+        "type": "FAQPage" if qa_pairs is not None else "Article",
         "jsonld": schema,
         "path": f"/answers/{topic.lower().replace(' ', '-')}"
     }
 
 @app.get("/v1/content/blocks")
-async def get_content_blocks(site_id: int):
+async def get_content_blocks(site_id: int, request: Request, response: Response):
     """Get generated content blocks"""
-    site_content = [c for c in generated_content if c["site_id"] == site_id]
-    return site_content
+    etag = await asyncio.to_thread(generated_content.etag, site_id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return await asyncio.to_thread(generated_content.for_site, site_id)
 
 if __name__ == "__main__":
     print("Starting Content Generator Service...")
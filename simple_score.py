@@ -4,26 +4,78 @@ Simplified Score Service for Demo
 Implements the AI Visibility Score calculation
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import asyncio
+import itertools
+from functools import lru_cache
+import os
+import numpy as np
+import orjson
 import uvicorn
+from simple_cache import ResponseCache
+from simple_store import RecordStore
 
-app = FastAPI(title="OmniFunnel • Demo Score Service")
+app = FastAPI(title="OmniFunnel • Demo Score Service", default_response_class=ORJSONResponse)
 
-# CORS for frontend connection
+# CORS for frontend connection: any origin without credentials unless CORS_ORIGINS lists the dashboards
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS or ["*"],
+    allow_credentials=bool(CORS_ORIGINS),
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
-# In-memory storage for demo
-scores = []
+# Storage
+scores = RecordStore(os.getenv("SCORE_DB", "score.sqlite3"), "scores", ("site_id", "cluster_id"))
+score_ids = itertools.count(len(scores) + 1)
+
+# Encoded GET responses per site, dropped when the site gets a new score
+score_responses = ResponseCache(ttl=30.0)
+
+# Demo subscore ranges and weights, in SUBSCORE_COMPONENTS order
+SUBSCORE_COMPONENTS = (
+    'prompt_sov',             # 30% weight
+    'generative_appearance',  # 20% weight
+    'citation_authority',     # 15% weight
+    'answer_quality',         # 10% weight
+    'voice_presence',         # 5% weight
+    'ai_traffic',             # 10% weight
+    'ai_conversions'          # 10% weight
+)
+SUBSCORE_LOW = np.array([45, 60, 40, 50, 15, 20, 10], dtype=np.float64)
+SUBSCORE_HIGH = np.array([85, 90, 80, 85, 40, 60, 45], dtype=np.float64)
+SUBSCORE_WEIGHTS = np.array([0.30, 0.20, 0.15, 0.10, 0.05, 0.10, 0.10])
+
+# Demo per-engine score ranges, split into a name tuple and range vectors
+ENGINE_RANGES = (
+    ('chatgpt', 40, 85),
+    ('claude', 35, 80),
+    ('gemini', 45, 90),
+    ('perplexity', 30, 75),
+    ('bing_copilot', 25, 70)
+)
+ENGINE_NAMES = tuple(name for name, _, _ in ENGINE_RANGES)
+ENGINE_LOW = np.array([low for _, low, _ in ENGINE_RANGES], dtype=np.float64)
+ENGINE_HIGH = np.array([high for _, _, high in ENGINE_RANGES], dtype=np.float64)
+
+# Recommendation rules: (subscore component, threshold, message), checked as one vector compare
+RECOMMENDATION_RULES = (
+    ('prompt_sov', 60, "Increase brand mentions by optimizing content for AI queries"),
+    ('citation_authority', 60, "Target higher-authority publications for backlinks and mentions"),
+    ('answer_quality', 70, "Improve content structure with lists, Q&As, and clear definitions"),
+    ('ai_traffic', 40, "Implement AI source tracking and attribution")
+)
+RULE_COMPONENTS = np.array([SUBSCORE_COMPONENTS.index(component) for component, _, _ in RECOMMENDATION_RULES])
+RULE_THRESHOLDS = np.array([threshold for _, threshold, _ in RECOMMENDATION_RULES], dtype=np.float64)
+RULE_MESSAGES = np.array([message for _, _, message in RECOMMENDATION_RULES], dtype=object)
 
 class ScoreCalculationRequest(BaseModel):
     site_id: int
@@ -47,112 +99,104 @@ async def health():
 async def calculate_score(request: ScoreCalculationRequest):
     """Calculate AI Visibility Score"""
     
-    # Generate realistic demo scores based on site_id for consistency
-    import random
-    random.seed(request.site_id * 100 + (request.cluster_id or 0))
+    subscores, total_score, engine_breakdown, recommendations = score_components(request.site_id, request.cluster_id)
     
-    # Calculate component scores (demo values)
-    subscores = {
-        'prompt_sov': round(random.uniform(45, 85), 1),           # 30% weight
-        'generative_appearance': round(random.uniform(60, 90), 1), # 20% weight
-        'citation_authority': round(random.uniform(40, 80), 1),   # 15% weight
-        'answer_quality': round(random.uniform(50, 85), 1),       # 10% weight
-        'voice_presence': round(random.uniform(15, 40), 1),       # 5% weight
-        'ai_traffic': round(random.uniform(20, 60), 1),           # 10% weight
-        'ai_conversions': round(random.uniform(10, 45), 1)        # 10% weight
+    # Create score response
+    score_data = {
+        "site_id": request.site_id,
+        "cluster_id": request.cluster_id,
+        "total": round(total_score, 1),
+        "subscores": dict(subscores),
+        "calculated_at": datetime.now().isoformat(),
+        "engine_breakdown": dict(engine_breakdown),
+        "recommendations": list(recommendations)
     }
     
-    # Calculate weighted total
-    weights = {
-        'prompt_sov': 0.30,
-        'generative_appearance': 0.20,
-        'citation_authority': 0.15,
-        'answer_quality': 0.10,
-        'voice_presence': 0.05,
-        'ai_traffic': 0.10,
-        'ai_conversions': 0.10
-    }
+    # Store score
+    score_data["score_id"] = next(score_ids)
+    await asyncio.to_thread(scores.append, score_data)
+    score_responses.invalidate(request.site_id)
     
-    total_score = sum(score * weights[component] for component, score in subscores.items())
+    return score_data
+
+@lru_cache(maxsize=4096)
+def score_components(site_id: int, cluster_id: Optional[int]) -> Tuple[Dict[str, float], float, Dict[str, float], Tuple[str, ...]]:
+    """Subscores, weighted total, engine breakdown and recommendations; deterministic per site/cluster, so cached"""
+    
+    # Generate realistic demo scores based on site_id for consistency
+    rng = np.random.default_rng(abs(site_id * 100 + (cluster_id or 0)))
+    
+    # Calculate component scores (demo values) and the weighted total in one dot product
+    subscore_values = np.round(rng.uniform(SUBSCORE_LOW, SUBSCORE_HIGH), 1)
+    subscores = dict(zip(SUBSCORE_COMPONENTS, subscore_values.tolist()))
+    total_score = float(subscore_values @ SUBSCORE_WEIGHTS)
     
     # Engine breakdown
-    engine_breakdown = {
-        'chatgpt': round(random.uniform(40, 85), 1),
-        'claude': round(random.uniform(35, 80), 1),
-        'gemini': round(random.uniform(45, 90), 1),
-        'perplexity': round(random.uniform(30, 75), 1),
-        'bing_copilot': round(random.uniform(25, 70), 1)
-    }
+    engine_values = np.round(rng.uniform(ENGINE_LOW, ENGINE_HIGH), 1)
+    engine_breakdown = dict(zip(ENGINE_NAMES, engine_values.tolist()))
     
-    # Generate recommendations
-    recommendations = []
-    if subscores['prompt_sov'] < 60:
-        recommendations.append("Increase brand mentions by optimizing content for AI queries")
-    if subscores['citation_authority'] < 60:
-        recommendations.append("Target higher-authority publications for backlinks and mentions")
-    if subscores['answer_quality'] < 70:
-        recommendations.append("Improve content structure with lists, Q&As, and clear definitions")
-    if subscores['ai_traffic'] < 40:
-        recommendations.append("Implement AI source tracking and attribution")
+    # Generate recommendations: every rule whose subscore falls below its threshold
+    recommendations = RULE_MESSAGES[subscore_values[RULE_COMPONENTS] < RULE_THRESHOLDS].tolist()
     
-    low_engines = [engine for engine, score in engine_breakdown.items() if score < 50]
+    low_engines = [ENGINE_NAMES[index] for index in np.flatnonzero(engine_values < 50)]
     if low_engines:
         recommendations.append(f"Focus optimization efforts on {', '.join(low_engines)}")
     
     if not recommendations:
         recommendations.append("Great performance! Consider expanding to additional keyword clusters")
     
-    # Create score response
-    score_data = {
-        "site_id": request.site_id,
-        "cluster_id": request.cluster_id,
-        "total": round(total_score, 1),
-        "subscores": subscores,
-        "calculated_at": datetime.now().isoformat(),
-        "engine_breakdown": engine_breakdown,
-        "recommendations": recommendations
-    }
-    
-    # Store score
-    score_data["score_id"] = len(scores) + 1
-    scores.append(score_data)
-    
-    return score_data
+    return subscores, total_score, engine_breakdown, tuple(recommendations)
 
 @app.get("/v1/score")
 async def get_latest_score(site_id: int, cluster_id: Optional[int] = None):
     """Get the most recent AI Visibility Score"""
     
-    # Find most recent score for this site/cluster
-    site_scores = [s for s in scores if s["site_id"] == site_id]
-    
-    if cluster_id:
-        site_scores = [s for s in site_scores if s.get("cluster_id") == cluster_id]
-    else:
-        site_scores = [s for s in site_scores if s.get("cluster_id") is None]
-    
-    if not site_scores:
-        raise HTTPException(status_code=404, detail="No score found for this site/cluster")
-    
-    # Return most recent
-    latest_score = max(site_scores, key=lambda x: x["calculated_at"])
-    return latest_score
+    cache_key = ("latest", cluster_id or None)
+    body = score_responses.get(site_id, cache_key)
+    if body is None:
+        # Most recent score for this site/cluster
+        score = await asyncio.to_thread(scores.last, site_id=site_id, cluster_id=cluster_id or None)
+        
+        if score is None:
+            raise HTTPException(status_code=404, detail="No score found for this site/cluster")
+        
+        body = orjson.dumps(score)
+        score_responses.put(site_id, cache_key, body)
+    
+    return Response(body, media_type="application/json")
 
 @app.get("/v1/score-history")
 async def get_score_history(site_id: int, cluster_id: Optional[int] = None, days: int = 30):
     """Get historical AI Visibility Scores"""
     
-    site_scores = [s for s in scores if s["site_id"] == site_id]
-    
-    if cluster_id:
-        site_scores = [s for s in site_scores if s.get("cluster_id") == cluster_id]
-    
-    # Sort by date (most recent first)
-    site_scores.sort(key=lambda x: x["calculated_at"], reverse=True)
-    
-    return site_scores
+    cache_key = ("history", cluster_id or None)
+    body = score_responses.get(site_id, cache_key)
+    if body is None:
+        if cluster_id:
+            site_scores = await asyncio.to_thread(scores.where, site_id=site_id, cluster_id=cluster_id)
+        else:
+            site_scores = await asyncio.to_thread(scores.for_site, site_id)
+        
+        # Sort by date (most recent first)
+        site_scores.sort(key=lambda x: x["calculated_at"], reverse=True)
+        
+        body = orjson.dumps(site_scores)
+        if site_scores:
+            score_responses.put(site_id, cache_key, body)
+    
+    return Response(body, media_type="application/json")
 
 if __name__ == "__main__":
     print("Starting OmniFunnel Demo Score Service...")
     print("AI Visibility Score API: http://localhost:8004")
-    uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
+    # Score ids and response caches are per process, so extra workers need a shared id source first
+    uvicorn.run(
+        "simple_score:app",
+        host="0.0.0.0",
+        port=8004,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False
+    )
\ No newline at end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed record storage for the standalone services
+Keeps JSON records durable across restarts and indexed by site_id
+Calls block on SQLite, so async handlers run them with asyncio.to_thread; each store serializes its own connection
+Database files are opened at import, relative to the working directory unless the service's *_DB variable says otherwise
+"""
+
+import hashlib
+import sqlite3
+import threading
+import orjson
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class RecordStore:
+    """Append-only list of JSON records stored in one SQLite table, indexed on the given record fields"""
+    
+    def __init__(self, path: str, table: str, columns: Tuple[str, ...] = ("site_id",)):
+        self.table = table
+        self.columns = columns
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            + "".join(f"{column}, " for column in columns)
+            + "body BLOB NOT NULL)"
+        )
+        for column in columns:
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+        self.db.commit()
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self.lock:
+            bodies = self.db.execute(f"SELECT body FROM {self.table} ORDER BY id").fetchall()
+        for (body,) in bodies:
+            yield orjson.loads(body)
+    
+    def append(self, record: Dict[str, Any]):
+        """Store a record under its indexed fields"""
+        self.extend((record,))
+    
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        """Store several records in one transaction"""
+        names = ", ".join(self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        rows = [(*(record.get(column) for column in self.columns), orjson.dumps(record)) for record in records]
+        with self.lock, self.db:
+            self.db.executemany(f"INSERT INTO {self.table} ({names}, body) VALUES ({marks}, ?)", rows)
+    
+    def _filter(self, filters: Dict[str, Any]) -> Tuple[str, Tuple[Any, ...]]:
+        """WHERE clause matching indexed fields; None matches a missing value"""
+        for column in filters:
+            if column not in self.columns:
+                raise ValueError(f"{self.table} is not indexed on {column}")
+        clause = " AND ".join(f"{column} IS ?" for column in filters)
+        return (f" WHERE {clause}" if clause else ""), tuple(filters.values())
+    
+    def where(self, limit: int = -1, **filters: Any) -> List[Dict[str, Any]]:
+        """Records matching every filter, oldest first, via the column indexes"""
+        clause, params = self._filter(filters)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT body FROM {self.table}{clause} ORDER BY id LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [orjson.loads(body) for (body,) in rows]
+    
+    def first(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        """Oldest record matching every filter, or None"""
+        records = self.where(limit=1, **filters)
+        return records[0] if records else None
+    
+    def last(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        """Newest record matching every filter, or None"""
+        clause, params = self._filter(filters)
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT body FROM {self.table}{clause} ORDER BY id DESC LIMIT 1", params
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+    
+    def count(self, **filters: Any) -> int:
+        """Number of records matching every filter"""
+        clause, params = self._filter(filters)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM {self.table}{clause}", params).fetchone()[0]
+    
+    def after(self, row_id: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """(row id, record) pairs stored after the given row id, oldest first"""
+        with self.lock:
+            rows = self.db.execute(f"SELECT id, body FROM {self.table} WHERE id > ? ORDER BY id", (row_id,)).fetchall()
+        return [(row, orjson.loads(body)) for row, body in rows]
+    
+    def for_site(self, site_id: int) -> List[Dict[str, Any]]:
+        """All records for a site, oldest first, via the site_id index"""
+        return self.where(site_id=site_id)
+    
+    def etag(self, site_id: Optional[int] = None) -> str:
+        """Validator that changes whenever records are added (for a site, or overall)"""
+        query = f"SELECT COUNT(*), MAX(id) FROM {self.table}"
+        params = ()
+        if site_id is not None:
+            query += " WHERE site_id = ?"
+            params = (site_id,)
+        with self.lock:
+            count, last_id = self.db.execute(query, params).fetchone()
+        digest = hashlib.blake2b(f"{self.table}:{site_id}:{count}:{last_id}".encode(), digest_size=8)
+        return f'"{digest.hexdigest()}"'
+    
+    def first_for_site(self, site_id: int) -> Optional[Dict[str, Any]]:
+        """Oldest record for a site, or None"""
+        return self.first(site_id=site_id)
+
+class KeyValueCache:
+    """Persistent JSON key/value cache stored in one SQLite table"""
+    
+    def __init__(self, path: str, table: str):
+        self.table = table
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self.db.commit()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None on a miss"""
+        with self.lock:
+            row = self.db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+    
+    def put(self, key: str, value: Any):
+        """Store or replace the value for key"""
+        with self.lock, self.db:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                (key, orjson.dumps(value))
+            )
@@ -4,44 +4,142 @@ Simplified Tracker Service for Demo
 Runs locally to demonstrate the frontend functionality
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import numpy as np
+import orjson
 import uvicorn
+from simple_cache import ResponseCache
+from simple_store import RecordStore
 import json
 import httpx
 import asyncio
 import re
 import os
+import itertools
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="OmniFunnel • Demo Tracker Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one pooled HTTP/2 client across engine queries"""
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=30.0,
+        http2=True
+    )
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(title="OmniFunnel • Demo Tracker Service", lifespan=lifespan, default_response_class=ORJSONResponse)
 
-# CORS for frontend connection
+# CORS for frontend connection: any origin without credentials unless CORS_ORIGINS lists the dashboards
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS or ["*"],
+    allow_credentials=bool(CORS_ORIGINS),
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
-# In-memory storage for demo
-sites = []
-clusters = []
-runs = []
-answers = []
-citations = []
+# Storage
+TRACKER_DB = os.getenv("TRACKER_DB", "tracker.sqlite3")
+sites = RecordStore(TRACKER_DB, "sites", ("site_id", "tenant_id"))
+clusters = RecordStore(TRACKER_DB, "clusters", ("cluster_id", "site_id"))
+runs = RecordStore(TRACKER_DB, "runs", ("run_id",))
+answers = RecordStore(TRACKER_DB, "answers", ("cluster_id", "run_id", "engine"))
+citations = RecordStore(TRACKER_DB, "citations", ("answer_id",))
+
+# Monotonic id sequences; safe across concurrent requests, unlike len() + 1.
+# Ids are drawn on the event loop, so they stay unique even though the store
+# writes that follow run in worker threads
+site_ids = itertools.count(len(sites) + 1)
+cluster_ids = itertools.count(len(clusters) + 1)
+run_ids = itertools.count(len(runs) + 1)
+answer_ids = itertools.count(len(answers) + 1)
+citation_ids = itertools.count(len(citations) + 1)
+
+# Column arrays over stored citations for aggregate scans, domains interned to ids;
+# synced incrementally from the store so rows written by other workers are picked up.
+# The sync runs in a worker thread; the lock keeps two syncs from appending the same rows
+citation_sync_lock = threading.Lock()
+domain_ids = {}
+domain_names = []
+cluster_sites = {}
+answer_sites = {}
+citation_columns = {
+    "site_id": np.empty(0, dtype=np.int32),
+    "position": np.empty(0, dtype=np.int16),
+    "domain_id": np.empty(0, dtype=np.int32)
+}
+synced_rows = {"answers": 0, "citations": 0}
 
 # Demo data
 demo_engines = ["chatgpt", "claude", "gemini", "perplexity", "bing_copilot"]
+ENGINES_BODY = orjson.dumps({"engines": demo_engines, "count": len(demo_engines)})
+
+# Encoded answer lists per cluster, dropped when the cluster gets a new run
+answer_responses = ResponseCache(ttl=30.0)
 
 # API Keys from environment
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "") 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
+# Request headers, built once
+OPENAI_HEADERS = {
+    "Authorization": f"Bearer {OPENAI_API_KEY}",
+    "Content-Type": "application/json"
+}
+ANTHROPIC_HEADERS = {
+    "x-api-key": ANTHROPIC_API_KEY,
+    "Content-Type": "application/json",
+    "anthropic-version": "2023-06-01"
+}
+GEMINI_HEADERS = {"Content-Type": "application/json"}
+
+# Citation URLs in engine answers, and the punctuation trimmed from their ends
+URL_RE = re.compile(r'https?://[^\s\[\]()]+(?:\([^\s)]*\))?[^\s\[\]().,;!?]*')
+URL_TRAILING_CHARS = '.,;!?)"\''
+
+# Engine call policy: short connect timeout, retries with backoff on timeouts and 5xx
+# inside one overall deadline, and a per-engine circuit that serves demo answers for a
+# while after repeated failures. httpx applies ENGINE_TIMEOUT to each read, write and
+# pool wait separately, so ENGINE_DEADLINE is what bounds a whole engine call
+ENGINE_TIMEOUT = httpx.Timeout(20.0, connect=3.0)
+ENGINE_DEADLINE = 20.0
+ENGINE_ATTEMPTS = 3
+ENGINE_BACKOFF = 0.2
+ENGINE_BACKOFF_MAX = 2.0
+CIRCUIT_FAILURE_LIMIT = 3
+CIRCUIT_OPEN_SECONDS = 60.0
+engine_failures = defaultdict(int)
+circuit_open_until = defaultdict(float)
+
+async def post_with_retries(url: str, **kwargs) -> httpx.Response:
+    """POST to an engine API, retrying timeouts and 5xx replies with exponential backoff until ENGINE_DEADLINE"""
+    async with asyncio.timeout(ENGINE_DEADLINE):
+        for attempt in range(ENGINE_ATTEMPTS):
+            last_attempt = attempt == ENGINE_ATTEMPTS - 1
+            try:
+                response = await app.state.http.post(url, timeout=ENGINE_TIMEOUT, **kwargs)
+                if response.status_code < 500 or last_attempt:
+                    return response
+            except httpx.TimeoutException:
+                if last_attempt:
+                    raise
+            await asyncio.sleep(min(ENGINE_BACKOFF * 2 ** attempt, ENGINE_BACKOFF_MAX))
+
 # Real AI Engine Integration
 async def query_openai(prompt: str) -> Dict[str, Any]:
     """Query OpenAI ChatGPT with real API"""
@@ -49,38 +147,33 @@ async def query_openai(prompt: str) -> Dict[str, Any]:
         return {"response": "OpenAI API key not configured", "citations": []}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-3.5-turbo",
-                    "messages": [
-                        {"role": "user", "content": f"{prompt}. Please provide sources and citations."}
-                    ],
-                    "max_tokens": 500
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
-                citations = extract_citations_from_text(content)
-                return {
-                    "response": content,
-                    "citations": citations,
-                    "confidence": 0.9,
-                    "engine": "chatgpt"
-                }
-            else:
-                return {"response": f"OpenAI API error: {response.status_code}", "citations": []}
+        response = await post_with_retries(
+            "https://api.openai.com/v1/chat/completions",
+            headers=OPENAI_HEADERS,
+            json={
+                "model": "gpt-3.5-turbo",
+                "messages": [
+                    {"role": "user", "content": f"{prompt}. Please provide sources and citations."}
+                ],
+                "max_tokens": 500
+            }
+        )
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            content = data["choices"][0]["message"]["content"]
+            citations = extract_citations_from_text(content)
+            return {
+                "response": content,
+                "citations": citations,
+                "confidence": 0.9,
+                "engine": "chatgpt"
+            }
+        else:
+            return {"response": f"OpenAI API error: {response.status_code}", "citations": [], "failed": True}
                 
     except Exception as e:
-        return {"response": f"OpenAI error: {str(e)}", "citations": []}
+        return {"response": f"OpenAI error: {str(e)}", "citations": [], "failed": True}
 
 async def query_anthropic(prompt: str) -> Dict[str, Any]:
     """Query Anthropic Claude with real API"""
@@ -88,39 +181,33 @@ async def query_anthropic(prompt: str) -> Dict[str, Any]:
         return {"response": "Anthropic API key not configured", "citations": []}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": ANTHROPIC_API_KEY,
-                    "Content-Type": "application/json",
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-3-haiku-20240307",
-                    "max_tokens": 500,
-                    "messages": [
-                        {"role": "user", "content": f"{prompt}. Please provide sources and citations."}
-                    ]
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data["content"][0]["text"]
-                citations = extract_citations_from_text(content)
-                return {
-                    "response": content,
-                    "citations": citations,
-                    "confidence": 0.88,
-                    "engine": "claude"
-                }
-            else:
-                return {"response": f"Anthropic API error: {response.status_code}", "citations": []}
+        response = await post_with_retries(
+            "https://api.anthropic.com/v1/messages",
+            headers=ANTHROPIC_HEADERS,
+            json={
+                "model": "claude-3-haiku-20240307",
+                "max_tokens": 500,
+                "messages": [
+                    {"role": "user", "content": f"{prompt}. Please provide sources and citations."}
+                ]
+            }
+        )
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            content = data["content"][0]["text"]
+            citations = extract_citations_from_text(content)
+            return {
+                "response": content,
+                "citations": citations,
+                "confidence": 0.88,
+                "engine": "claude"
+            }
+        else:
+            return {"response": f"Anthropic API error: {response.status_code}", "citations": [], "failed": True}
                 
     except Exception as e:
-        return {"response": f"Anthropic error: {str(e)}", "citations": []}
+        return {"response": f"Anthropic error: {str(e)}", "citations": [], "failed": True}
 
 async def query_google_gemini(prompt: str) -> Dict[str, Any]:
     """Query Google Gemini with real API"""
@@ -128,53 +215,124 @@ async def query_google_gemini(prompt: str) -> Dict[str, Any]:
         return {"response": "Google API key not configured", "citations": []}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent?key={GOOGLE_API_KEY}",
-                headers={"Content-Type": "application/json"},
-                json={
-                    "contents": [{
-                        "parts": [{
-                            "text": f"{prompt}. Please provide detailed information with sources and citations."
-                        }]
-                    }],
-                    "generationConfig": {
-                        "maxOutputTokens": 500,
-                        "temperature": 0.7
-                    }
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data["candidates"][0]["content"]["parts"][0]["text"]
-                citations = extract_citations_from_text(content)
-                return {
-                    "response": content,
-                    "citations": citations,
-                    "confidence": 0.92,
-                    "engine": "gemini"
+        response = await post_with_retries(
+            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent?key={GOOGLE_API_KEY}",
+            headers=GEMINI_HEADERS,
+            json={
+                "contents": [{
+                    "parts": [{
+                        "text": f"{prompt}. Please provide detailed information with sources and citations."
+                    }]
+                }],
+                "generationConfig": {
+                    "maxOutputTokens": 500,
+                    "temperature": 0.7
                 }
-            else:
-                return {"response": f"Gemini API error: {response.status_code}", "citations": []}
+            }
+        )
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            content = data["candidates"][0]["content"]["parts"][0]["text"]
+            citations = extract_citations_from_text(content)
+            return {
+                "response": content,
+                "citations": citations,
+                "confidence": 0.92,
+                "engine": "gemini"
+            }
+        else:
+            return {"response": f"Gemini API error: {response.status_code}", "citations": [], "failed": True}
                 
     except Exception as e:
-        return {"response": f"Gemini error: {str(e)}", "citations": []}
+        return {"response": f"Gemini error: {str(e)}", "citations": [], "failed": True}
+
+async def query_demo_engine(engine: str, prompt: str) -> Dict[str, Any]:
+    """Fallback to demo for engines not yet implemented (Perplexity, Bing Copilot)"""
+    return {
+        "response": f"Demo response from {engine.upper()} for '{prompt}': This is a comprehensive analysis showing key insights and recommendations based on current industry data and research.",
+        "citations": [f"https://demo-{engine}.com/source1", f"https://example-{engine}.org/source2", f"https://research-{engine}.edu/source3"],
+        "confidence": 0.8,
+        "engine": engine
+    }
+
+# Real engine clients by engine name; anything else gets a demo answer
+ENGINE_QUERIES = {
+    "chatgpt": query_openai,
+    "claude": query_anthropic,
+    "gemini": query_google_gemini
+}
+
+async def query_engine(engine: str, prompt: str) -> Dict[str, Any]:
+    """Query one engine for a prompt, short-circuiting to the demo answer while its circuit is open"""
+    query = ENGINE_QUERIES.get(engine)
+    if query is None or time.monotonic() < circuit_open_until[engine]:
+        return await query_demo_engine(engine, prompt)
+    
+    ai_response = await query(prompt)
+    
+    if ai_response.get("failed"):
+        engine_failures[engine] += 1
+        if engine_failures[engine] >= CIRCUIT_FAILURE_LIMIT:
+            circuit_open_until[engine] = time.monotonic() + CIRCUIT_OPEN_SECONDS
+            engine_failures[engine] = 0
+    else:
+        engine_failures[engine] = 0
+    
+    return ai_response
 
 def extract_citations_from_text(text: str) -> List[str]:
     """Extract URLs from response text"""
-    url_pattern = r'https?://[^\s\[\]()]+(?:\([^\s)]*\))?[^\s\[\]().,;!?]*'
-    urls = re.findall(url_pattern, text)
-    
-    # Clean and validate URLs
-    clean_urls = []
-    for url in urls:
-        url = url.rstrip('.,;!?)"\'')
-        if url.startswith(('http://', 'https://')) and '.' in url:
-            clean_urls.append(url)
+    urls = (url.rstrip(URL_TRAILING_CHARS) for url in URL_RE.findall(text))
     
-    return list(set(clean_urls))  # Remove duplicates
+    # Clean and validate URLs, removing duplicates in first-seen order
+    return list(dict.fromkeys(
+        url for url in urls
+        if url.startswith(('http://', 'https://')) and '.' in url
+    ))
+
+@lru_cache(maxsize=4096)
+def citation_domain(url: str) -> str:
+    """Host of a citation URL, without userinfo or port; the same URLs recur across runs"""
+    return urlsplit(url).hostname or url
+
+def sync_citation_columns() -> Dict[str, np.ndarray]:
+    """Snapshot of the citation column arrays, after appending rows stored since the last sync"""
+    with citation_sync_lock:
+        for row_id, answer in answers.after(synced_rows["answers"]):
+            cluster_id = answer["cluster_id"]
+            if cluster_id not in cluster_sites:
+                # A run always reads its cluster first, so a missing one marks orphaned answers to skip
+                cluster = clusters.first(cluster_id=cluster_id)
+                cluster_sites[cluster_id] = cluster["site_id"] if cluster else None
+            answer_sites[answer["answer_id"]] = cluster_sites[cluster_id]
+            synced_rows["answers"] = row_id
+        
+        site_column, position_column, domain_column = [], [], []
+        last_row = synced_rows["citations"]
+        for row_id, citation in citations.after(last_row):
+            # Another worker may store a citation after our answer pass; pick it up on the next sync
+            if citation["answer_id"] not in answer_sites:
+                break
+            last_row = row_id
+            site_id = answer_sites[citation["answer_id"]]
+            if site_id is None:
+                continue
+            domain = citation["normalized_domain"]
+            if domain not in domain_ids:
+                domain_ids[domain] = len(domain_names)
+                domain_names.append(domain)
+            site_column.append(site_id)
+            position_column.append(citation["position"])
+            domain_column.append(domain_ids[domain])
+        
+        if site_column:
+            for name, values in (("site_id", site_column), ("position", position_column), ("domain_id", domain_column)):
+                column = citation_columns[name]
+                citation_columns[name] = np.concatenate((column, np.array(values, dtype=column.dtype)))
+        synced_rows["citations"] = last_row
+        
+        return dict(citation_columns)
 
 # Pydantic models
 class SiteCreate(BaseModel):
@@ -221,6 +379,15 @@ class AnswerResponse(BaseModel):
     answer_hash: str
     created_at: str
 
+# List validators built once; each validates and serializes a whole list in one pass
+SITE_LIST = TypeAdapter(List[SiteResponse])
+CLUSTER_LIST = TypeAdapter(List[ClusterResponse])
+ANSWER_LIST = TypeAdapter(List[AnswerResponse])
+
+def list_response(adapter: TypeAdapter, records: List[Dict[str, Any]]) -> Response:
+    """Validate records against a list model and return them as a JSON response"""
+    return Response(adapter.dump_json(adapter.validate_python(records)), media_type="application/json")
+
 
 @app.get("/health")
 async def health():
@@ -245,14 +412,11 @@ async def root():
 
 @app.get("/v1/engines")
 async def list_engines():
-    return {
-        "engines": demo_engines,
-        "count": len(demo_engines)
-    }
+    return Response(ENGINES_BODY, media_type="application/json")
 
 @app.post("/v1/sites", response_model=SiteResponse)
 async def create_site(site: SiteCreate):
-    site_id = len(sites) + 1
+    site_id = next(site_ids)
     new_site = {
         "site_id": site_id,
         "domain": site.domain,
@@ -260,23 +424,22 @@ async def create_site(site: SiteCreate):
         "tenant_id": site.tenant_id,
         "created_at": datetime.now().isoformat()
     }
-    sites.append(new_site)
+    await asyncio.to_thread(sites.append, new_site)
     
     return SiteResponse(**new_site)
 
 @app.get("/v1/sites", response_model=List[SiteResponse])
 async def list_sites(tenant_id: int):
-    tenant_sites = [s for s in sites if s.get("tenant_id") == tenant_id]
-    return [SiteResponse(**site) for site in tenant_sites]
+    return list_response(SITE_LIST, await asyncio.to_thread(sites.where, tenant_id=tenant_id))
 
 @app.post("/v1/sites/{site_id}/clusters", response_model=ClusterResponse)
 async def create_cluster(site_id: int, cluster: ClusterCreate):
     # Verify site exists
-    site = next((s for s in sites if s["site_id"] == site_id), None)
+    site = await asyncio.to_thread(sites.first, site_id=site_id)
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
     
-    cluster_id = len(clusters) + 1
+    cluster_id = next(cluster_ids)
     new_cluster = {
         "cluster_id": cluster_id,
         "site_id": site_id,
@@ -286,7 +449,7 @@ async def create_cluster(site_id: int, cluster: ClusterCreate):
         "keywords": cluster.keywords,
         "created_at": datetime.now().isoformat()
     }
-    clusters.append(new_cluster)
+    await asyncio.to_thread(clusters.append, new_cluster)
     
     return ClusterResponse(
         cluster_id=new_cluster["cluster_id"],
@@ -298,25 +461,16 @@ async def create_cluster(site_id: int, cluster: ClusterCreate):
 
 @app.get("/v1/sites/{site_id}/clusters", response_model=List[ClusterResponse])
 async def list_clusters(site_id: int):
-    site_clusters = [c for c in clusters if c.get("site_id") == site_id]
-    return [
-        ClusterResponse(
-            cluster_id=c["cluster_id"],
-            name=c["name"],
-            description=c["description"],
-            keywords=c["keywords"],
-            created_at=c["created_at"]
-        ) for c in site_clusters
-    ]
+    return list_response(CLUSTER_LIST, await asyncio.to_thread(clusters.where, site_id=site_id))
 
 @app.post("/v1/clusters/{cluster_id}/run", response_model=RunResponse)
 async def run_cluster_tracking(cluster_id: int, request: RunRequest):
     # Find cluster
-    cluster = next((c for c in clusters if c["cluster_id"] == cluster_id), None)
+    cluster = await asyncio.to_thread(clusters.first, cluster_id=cluster_id)
     if not cluster:
         raise HTTPException(status_code=404, detail="Cluster not found")
     
-    run_id = len(runs) + 1
+    run_id = next(run_ids)
     new_run = {
         "run_id": run_id,
         "cluster_id": cluster_id,
@@ -325,29 +479,24 @@ async def run_cluster_tracking(cluster_id: int, request: RunRequest):
         "started_at": datetime.now().isoformat(),
         "variant_count": request.variant_sample
     }
-    runs.append(new_run)
+    await asyncio.to_thread(runs.append, new_run)
     
     # Generate REAL AI answers using actual APIs
     engines_to_test = [request.engine] if request.engine else ["chatgpt", "claude"]  # Focus on working engines
     
-    for i, engine in enumerate(engines_to_test):
-        answer_id = len(answers) + 1
+    # Query every engine concurrently; latency is the slowest engine, not the sum
+    ai_responses = await asyncio.gather(
+        *[query_engine(engine, cluster['seed_prompt']) for engine in engines_to_test],
+        return_exceptions=True
+    )
+    
+    run_answers = []
+    run_citations = []
+    for engine, ai_response in zip(engines_to_test, ai_responses):
+        if isinstance(ai_response, Exception):
+            ai_response = {"response": f"{engine} error: {str(ai_response)}", "citations": []}
         
-        # Query real AI engines
-        if engine == "chatgpt":
-            ai_response = await query_openai(cluster['seed_prompt'])
-        elif engine == "claude":
-            ai_response = await query_anthropic(cluster['seed_prompt'])
-        elif engine == "gemini":
-            ai_response = await query_google_gemini(cluster['seed_prompt'])
-        else:
-            # Fallback to demo for engines not yet implemented (Perplexity, Bing Copilot)
-            ai_response = {
-                "response": f"Demo response from {engine.upper()} for '{cluster['seed_prompt']}': This is a comprehensive analysis showing key insights and recommendations based on current industry data and research.",
-                "citations": [f"https://demo-{engine}.com/source1", f"https://example-{engine}.org/source2", f"https://research-{engine}.edu/source3"],
-                "confidence": 0.8,
-                "engine": engine
-            }
+        answer_id = next(answer_ids)
         
         real_answer = {
             "answer_id": answer_id,
@@ -360,13 +509,13 @@ async def run_cluster_tracking(cluster_id: int, request: RunRequest):
             "answer_hash": f"hash_{answer_id}_{engine}",
             "created_at": datetime.now().isoformat()
         }
-        answers.append(real_answer)
+        run_answers.append(real_answer)
         
         # Add citations
         for j, url in enumerate(ai_response["citations"]):
-            citation_id = len(citations) + 1
-            domain = url.split("//")[1].split("/")[0] if "//" in url else url
-            citations.append({
+            citation_id = next(citation_ids)
+            domain = citation_domain(url)
+            run_citations.append({
                 "citation_id": citation_id,
                 "answer_id": answer_id,
                 "url": url,
@@ -374,38 +523,66 @@ async def run_cluster_tracking(cluster_id: int, request: RunRequest):
                 "position": j + 1
             })
     
+    # Store the run's answers and citations in one transaction each
+    await asyncio.to_thread(answers.extend, run_answers)
+    answer_responses.invalidate(cluster_id)
+    await asyncio.to_thread(citations.extend, run_citations)
+    
     return RunResponse(**new_run)
 
 @app.get("/v1/clusters/{cluster_id}/answers", response_model=List[AnswerResponse])
 async def get_cluster_answers(cluster_id: int, engine: Optional[str] = None, limit: int = 50):
-    cluster_answers = [a for a in answers if a.get("cluster_id") == cluster_id]
-    
-    if engine:
-        cluster_answers = [a for a in cluster_answers if a.get("engine") == engine]
+    body = answer_responses.get(cluster_id, (engine, limit))
+    if body is None:
+        if engine:
+            cluster_answers = await asyncio.to_thread(answers.where, limit=limit, cluster_id=cluster_id, engine=engine)
+        else:
+            cluster_answers = await asyncio.to_thread(answers.where, limit=limit, cluster_id=cluster_id)
+        
+        body = ANSWER_LIST.dump_json(ANSWER_LIST.validate_python(cluster_answers))
+        if cluster_answers:
+            answer_responses.put(cluster_id, (engine, limit), body)
     
-    return [AnswerResponse(**answer) for answer in cluster_answers[:limit]]
+    return Response(body, media_type="application/json")
 
 @app.get("/v1/answers/{answer_id}/citations")
 async def get_answer_citations(answer_id: int):
-    answer_citations = [c for c in citations if c.get("answer_id") == answer_id]
-    return answer_citations
+    return await asyncio.to_thread(citations.where, answer_id=answer_id)
 
 @app.get("/v1/runs/{run_id}/status")
 async def get_run_status(run_id: int):
-    run = next((r for r in runs if r["run_id"] == run_id), None)
+    run = await asyncio.to_thread(runs.first, run_id=run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    run_answers = [a for a in answers if a.get("run_id") == run_id]
-    
     return {
         "run_id": run_id,
         "status": run["status"],
         "started_at": run["started_at"],
-        "answer_count": len(run_answers),
+        "answer_count": await asyncio.to_thread(answers.count, run_id=run_id),
         "cost_estimate": 2.50
     }
 
+@app.get("/v1/analytics/top-domains")
+async def get_top_domains(site_id: int, limit: int = 10):
+    """Most cited domains for a site, with their average citation position"""
+    columns = await asyncio.to_thread(sync_citation_columns)
+    mask = columns["site_id"] == site_id
+    site_domains = columns["domain_id"][mask]
+    
+    counts = np.bincount(site_domains, minlength=len(domain_names))
+    position_sums = np.bincount(site_domains, weights=columns["position"][mask], minlength=len(domain_names))
+    top = np.argsort(-counts, kind="stable")[:limit]
+    
+    return [
+        {
+            "domain": domain_names[domain_id],
+            "citations": int(counts[domain_id]),
+            "average_position": round(float(position_sums[domain_id] / counts[domain_id]), 2)
+        }
+        for domain_id in top.tolist() if counts[domain_id]
+    ]
+
 if __name__ == "__main__":
     print("Starting OmniFunnel Demo Tracker Service...")
     print("This will make the frontend fully functional for testing!")
@@ -417,4 +594,14 @@ if __name__ == "__main__":
     print(f"Service starting on {host}:{port}")
     print(f"Health check: http://{host}:{port}/health")
     
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    # Ids and response caches are per process, so extra workers need a shared id source first
+    uvicorn.run(
+        "simple_tracker:app",
+        host=host,
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False
+    )
\ No newline at end of file